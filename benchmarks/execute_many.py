@@ -0,0 +1,51 @@
+"""
+Measure how the throughput of `execute_many` scales with the number of
+worker processes.
+
+    python3 benchmarks/execute_many.py [number of programs] [max workers]
+
+Scaling on 8 cores has not been measured yet. The only run so far was on
+a machine with 1 CPU, where extra workers can only add overhead:
+
+    2000 programs, 1 CPUs
+      1 workers:    1.48 s,      1355 programs/s, speedup 1.00x
+      2 workers:    1.52 s,      1314 programs/s, speedup 0.97x
+      4 workers:    1.58 s,      1262 programs/s, speedup 0.93x
+      8 workers:    1.57 s,      1270 programs/s, speedup 0.94x
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jimmy_script
+
+# A program heavy enough for the work to outweigh sending it to a worker
+PROGRAM = "\n".join(["let y = (x * 3 + 1) ^ 2 / (x + 1)"] + ["let y = (y * 3 - x) / (y + 2) + x ^ 2"] * 200 + ["y"])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    sources = [PROGRAM] * count
+    bindings = [{"x": idx} for idx in range(count)]
+
+    print(f"{count} programs, {os.cpu_count()} CPUs")
+    baseline = None
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        results = jimmy_script.execute_many(sources, bindings, workers=workers)
+        elapsed = time.perf_counter() - start
+        assert all(error is None for _, error in results)
+
+        throughput = count / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:3} workers: {elapsed:7.2f} s, {throughput:9.0f} programs/s, "
+              f"speedup {throughput / baseline:.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
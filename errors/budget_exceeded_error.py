@@ -0,0 +1,14 @@
+from errors.interpret_error import InterpretError
+from models.context import ExecutionContext
+from models.position import Interval
+
+
+class BudgetExceededError(InterpretError):
+    """
+    An error stopping an execution that went over one of the limits of
+    its `Budget`.
+    """
+
+    def __init__(self, msg: str, interval: Interval, context: ExecutionContext):
+        super().__init__(msg, interval, context)
+        self.name = "Budget Exceeded"
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from models.position import Interval
 from utils import arrows_under_string
 
@@ -9,14 +11,28 @@ class Error:
     msg: str
     # The interval of characters triggering this error
     interval: Interval
+    # Text of this error, rendered on first use
+    _text: Optional[str]
+    # Row of the error when `_text` was rendered, as the row of an error
+    # in a file being edited can change
+    _text_row: Optional[int]
 
     def __init__(self, name: str, msg: str, interval: Interval) -> None:
         self.name = name
         self.msg = msg
         self.interval = interval
+        self._text = None
+        self._text_row = None
 
-    def __str__(self) -> str:
+    def render(self) -> str:
         return f"{self.name}: " \
                f"\n\t{self.msg}" \
                f"\nAt Line {self.interval.start.row + 1} in File {self.interval.file.name}.\n\n" \
-               f">>> {arrows_under_string(self.interval.file.content, self.interval, 4)}\n"
+               f">>> {arrows_under_string(self.interval.file, self.interval, 4)}\n"
+
+    def __str__(self) -> str:
+        row = self.interval.start.row
+        if self._text is None or self._text_row != row:
+            self._text = self.render()
+            self._text_row = row
+        return self._text
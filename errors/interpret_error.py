@@ -2,6 +2,10 @@ from errors.error import Error
 from models.context import ExecutionContext
 from models.position import Interval, NEW_LINE
 
+# Message of the error given by engines recursing once per level of the
+# AST, when an expression is nested deeper than the recursion limit
+NESTED_TOO_DEEPLY = "Expression is nested too deeply."
+
 
 class InterpretError(Error):
     context: ExecutionContext
@@ -26,8 +30,8 @@ class InterpretError(Error):
 
         return "Traceback (most recent call first):" + NEW_LINE + result
 
-    def __str__(self):
-        result = super().__str__()
+    def render(self) -> str:
+        result = super().render()
         result += NEW_LINE
         result += self.get_traceback()
         return result
@@ -0,0 +1,14 @@
+from errors.error import Error
+
+
+class RaisedError(Exception):
+    """
+    An exception carrying an `Error`, used by processors that raise
+    errors instead of returning them in a promise.
+    """
+    # The error being raised
+    error: Error
+
+    def __init__(self, error: Error) -> None:
+        super().__init__(error.msg)
+        self.error = error
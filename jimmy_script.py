@@ -1,34 +1,600 @@
+import asyncio
+import math
+import mmap
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Generator, Iterator, List, Tuple
+
+from errors.error import Error
+from models.batch_result import BatchResult
+from models.bytecode import Bytecode
+from models.budget import Budget
+from models.compile_cache import CompileCache
 from models.context import ExecutionContext
-from models.position import File
+from models.execution_stats import *
+from models.position import File, FileChunk, Interval, OffsetPosition
+from models.program import Program
+from models.snapshot import Snapshot
+from models.token import TOKEN_CODES, TOKEN_NEWLINE, TOKEN_EOF
 from models.variable_register import VariableRegister
+from values.number import Number
+from nodes.node import Node
+from nodes.node_arena import NodeArena
+from processors.arena_interpreter import ArenaInterpreter
+from processors.batch_evaluator import BatchEvaluator
+from processors.closure_compiler import ClosureCompiler
+from processors.codegen import PythonCodeGenerator
+from processors.direct_interpreter import DirectInterpreter
 from processors.interpreter import Interpreter
-from processors.laxer import Lexer
-from processors.parser import Parser
+from processors.laxer import FastLexer
+from processors.optimizer import Optimizer
+from processors.iterative_parser import IterativeParser
+from processors.stream_laxer import StreamLexer, DEFAULT_CHUNK_SIZE
+from processors.vm import VirtualMachine, DEFAULT_SLICE_SIZE
+from utils import run_to_end
+
+
+# Execution engines
+ENGINE_TREE = "tree"
+ENGINE_DIRECT = "direct"
+ENGINE_ARENA = "arena"
+ENGINE_CLOSURE = "closure"
+ENGINE_VM = "vm"
+ENGINE_PYTHON = "python"
+
+ENGINES = {
+    ENGINE_TREE: Interpreter,
+    ENGINE_DIRECT: DirectInterpreter,
+    ENGINE_ARENA: ArenaInterpreter,
+    ENGINE_CLOSURE: ClosureCompiler,
+    ENGINE_VM: VirtualMachine,
+    ENGINE_PYTHON: PythonCodeGenerator,
+}
+
+compile_cache = CompileCache()
+
+
+def compile_program(raw: str, fn: str, optimize: bool = True, stats: ExecutionStats = None) -> Program:
+    """
+    Compile code into a program with `parse_program`, looking it up in
+    and adding it to `compile_cache`. The file name is part of the key,
+    as it shows up in error messages.
+    """
+    key = (fn, raw, optimize)
+    program = compile_cache.get(key)
+    if program is not None:
+        if stats is not None:
+            stats.cached = True
+        return program
+
+    program = parse_program(raw, fn, optimize, stats)
+    compile_cache.put(key, program)
+    return program
 
 
-variable_register = VariableRegister()
+def parse_program(raw: str, fn: str, optimize: bool = True, stats: ExecutionStats = None) -> Program:
+    """
+    Lex and parse code made of newline separated statements into a
+    program, then optimize it unless `optimize` is False. The time spent
+    in every phase is added to `stats` if given.
+    """
+    return run_to_end(parse_program_sliced(raw, fn, optimize, stats))
 
 
-def execute(raw: str, fn: str):
+def parse_program_sliced(raw: str, fn: str, optimize: bool = True, stats: ExecutionStats = None,
+                         slice_size: int = None) -> Generator[None, None, Program]:
+    """
+    Return the same program as `parse_program`. If `slice_size` is given,
+    None is generated between slices of work: lexing about `slice_size`
+    characters of complete lines, parsing about `slice_size` tokens, and
+    optimizing about `slice_size` nodes.
+    """
     # Construct file object
     file = File(fn, raw)
 
     # Get tokens from laxer
-    lexer = Lexer(raw, file)
-    tokens, error = lexer.get_tokens()
+    started = time.perf_counter() if stats is not None else 0
+    lexer = FastLexer(raw, file, multiline=True)
+    if slice_size is None:
+        tokens, error = lexer.get_token_stream()
+    else:
+        tokens, error = yield from lexer.get_token_stream_sliced(slice_size)
+    if stats is not None:
+        lexed = time.perf_counter()
+        stats.add_time(PHASE_LEX, lexed - started)
+        started = lexed
     if error:
-        return None, error
+        return Program(file, [], error)
+
+    if stats is not None:
+        # Newlines and the end of the file are not counted
+        types = tokens.types
+        stats.token_count = len(types) - types.count(TOKEN_CODES[TOKEN_NEWLINE]) - \
+            types.count(TOKEN_CODES[TOKEN_EOF])
+    # Get abstract syntax trees, stopping at the first bad statement
+    parser = IterativeParser(tokens)
+    optimizer = Optimizer()
+    nodes = []
+    folds = []
+    unoptimized = {}
+    # Seconds spent optimizing, not counted as parsing
+    optimize_time = 0.0
+    # Index of the first token parsed since the last pause
+    slice_start = 0
+    for ast in parser.parse_statements(slice_size):
+        if ast is None:
+            # A long statement is being parsed
+            slice_start = parser.curr_idx
+            yield
+            continue
+        if ast.error:
+            error = ast.error
+            nodes = []
+            folds = []
+            unoptimized = {}
+            break
+        if not optimize:
+            nodes.append(ast.node)
+            folds.append([])
+        elif slice_size is not None:
+            nodes.append((yield from optimizer.optimize_sliced(ast.node, slice_size)))
+            folds.append(optimizer.folds)
+        elif stats is None:
+            nodes.append(optimizer.optimize(ast.node))
+            folds.append(optimizer.folds)
+        else:
+            optimize_started = time.perf_counter()
+            nodes.append(optimizer.optimize(ast.node))
+            folds.append(optimizer.folds)
+            optimize_time += time.perf_counter() - optimize_started
+        if optimize and optimizer.folds:
+            unoptimized[len(nodes) - 1] = ast.node
+        if slice_size is not None and parser.curr_idx - slice_start >= slice_size:
+            slice_start = parser.curr_idx
+            yield
+    program = Program(file, nodes, error, folds, unoptimized, parser.symbol_table.names)
+    if stats is not None:
+        stats.add_time(PHASE_OPTIMIZE, optimize_time)
+        stats.add_time(PHASE_PARSE, time.perf_counter() - started - optimize_time)
+    return program
+
+
+def compile_for_vm(raw: str, fn: str, optimize: bool = True, slice_size: int = DEFAULT_SLICE_SIZE) \
+        -> Generator[None, None, Program]:
+    """
+    Return a program compiled like `compile_program`, along with its
+    bytecode, doing the work in slices of about `slice_size` characters,
+    tokens or nodes and generating None after every slice, so that an
+    event loop can run other tasks meanwhile. See `parse_program_sliced`.
+    """
+    key = (fn, raw, optimize)
+    program = compile_cache.get(key)
+    if program is None:
+        program = yield from parse_program_sliced(raw, fn, optimize, None, slice_size)
+        compile_cache.put(key, program)
+    if not program.error:
+        yield from program.get_compiled_sliced(ENGINE_VM, VirtualMachine(), slice_size)
+    return program
+
+
+def count_node_types(roots: List[Node], counts: dict) -> None:
+    """ Add the number of nodes of every type in ASTs to `counts`, mapping name of node type to count. """
+    for root in roots:
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            name = type(node).__name__
+            counts[name] = counts.get(name, 0) + 1
+            stack.extend(NodeArena.get_children(node))
+
+
+class Session:
+    """
+    An isolated environment to execute code in, with its own variables and
+    execution context. Programs are compiled once and shared by all
+    sessions through `compile_cache`, so that different sessions can run
+    on different threads at the same time. A single session is not meant
+    to be used by two threads at once.
+    """
+    # Name of the execution engine used by default
+    engine: str
+    # Variables defined by the code executed in this session
+    variable_register: VariableRegister
+    # Context the code is executed in
+    context: ExecutionContext
+
+    def __init__(self, engine: str = ENGINE_VM, name: str = "main program"):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'.")
+        self.engine = engine
+        self.variable_register = VariableRegister()
+        self.context = ExecutionContext(name)
+        self.context.variable_register = self.variable_register
+
+    def execute(self, raw: str, fn: str, engine: str = None, optimize: bool = True, budget: Budget = None,
+                stats: ExecutionStats = None):
+        """
+        Execute code made of newline separated statements. Return the value
+        of the last statement, or the first error. If a `budget` is given,
+        the execution stops with a `BudgetExceededError` when going over it.
+        If `stats` is given, `stats` is filled in.
+        """
+        program = compile_program(raw, fn, optimize, stats)
+        if program.error:
+            return None, program.error
+        engine = engine or self.engine
+        if stats is not None:
+            return self.execute_with_stats(program, engine, budget, stats)
+
+        # Interpret AST of every statement
+        interpreter = ENGINES[engine]()
+        execution_context = self.context
+        execution_context.budget = budget
+        execution_context.slots = program.get_slots(self.variable_register.symbol_table)
+        if budget is not None:
+            budget.start()
+
+        value = None
+        for idx, code in enumerate(program.get_compiled(engine, interpreter)):
+            if budget is not None:
+                error = budget.charge_statement(program, idx, execution_context)
+                if error:
+                    return None, error
+                if budget.exceeds_folds(program, idx):
+                    code = program.get_unoptimized(engine, interpreter, idx)
+            value, error = interpreter.run(code, execution_context)
+            if error:
+                return None, error
+        return value, None
+
+    def execute_with_stats(self, program: Program, engine: str, budget: Budget or None, stats: ExecutionStats):
+        """
+        Execute a program like `execute`, filling in `stats`. Allocations
+        are counted by the execution context of the session while it holds
+        `stats`, so that executions in other sessions and threads are not
+        counted, and do not pay for counting.
+        """
+        count_node_types(program.nodes, stats.node_counts)
+        interpreter = ENGINES[engine]()
+        execution_context = self.context
+        execution_context.budget = budget
+        execution_context.slots = program.get_slots(self.variable_register.symbol_table)
+        if budget is not None:
+            budget.start()
+
+        started = time.perf_counter()
+        compiled = program.get_compiled(engine, interpreter)
+        stats.add_time(PHASE_COMPILE, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        value, error = None, None
+        execution_context.stats = stats
+        try:
+            for idx, code in enumerate(compiled):
+                if budget is not None:
+                    error = budget.charge_statement(program, idx, execution_context)
+                    if error:
+                        break
+                    if budget.exceeds_folds(program, idx):
+                        code = program.get_unoptimized(engine, interpreter, idx)
+                value, error = interpreter.run(code, execution_context)
+                if error:
+                    break
+        finally:
+            execution_context.stats = None
+        stats.add_time(PHASE_RUN, time.perf_counter() - started)
+        return (None, error) if error else (value, None)
+
+    async def execute_async(self, raw: str, fn: str, optimize: bool = True, budget: Budget = None,
+                            slice_size: int = DEFAULT_SLICE_SIZE):
+        """
+        Execute code like `execute` on the virtual machine, giving control
+        back to the event loop after every `slice_size` instructions, so
+        that long programs do not hold up other tasks. Lexing, parsing and
+        compiling are sliced too, see `compile_for_vm`.
+        """
+        steps = compile_for_vm(raw, fn, optimize, slice_size)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as stop:
+                program = stop.value
+                break
+            await asyncio.sleep(0)
+        if program.error:
+            return None, program.error
+
+        vm = VirtualMachine()
+        compiled = program.get_compiled(ENGINE_VM, vm)
+        execution_context = self.context
+        if budget is not None:
+            budget.start()
+
+        # Number of instructions executed since the last pause
+        offset = 0
+        value = None
+        for idx, bytecode in enumerate(compiled):
+            if budget is not None:
+                error = budget.charge_statement(program, idx, execution_context)
+                if error:
+                    return None, error
+                if budget.exceeds_folds(program, idx):
+                    bytecode = program.get_unoptimized(ENGINE_VM, vm, idx)
+            # Other tasks may have run in this session since the last pause
+            execution_context.budget = budget
+            runner = vm.run_sliced(bytecode, execution_context, slice_size, offset)
+            while True:
+                try:
+                    next(runner)
+                except StopIteration as stop:
+                    value, error = stop.value
+                    break
+                await asyncio.sleep(0)
+                execution_context.budget = budget
+            if error:
+                return None, error
+
+            offset = (offset + len(bytecode.code)) % slice_size
+            if offset == 0:
+                await asyncio.sleep(0)
+        return value, None
+
+    def execute_batch(self, source: str or Node, columns: dict, fn: str = "<batch>") \
+            -> Tuple[BatchResult or None, Error or None]:
+        """
+        Evaluate a single expression, given as code or as an AST, once for
+        every row of `columns`, a dictionary mapping name of variable to a
+        NumPy array of values. See `BatchEvaluator`.
+        """
+        if isinstance(source, Node):
+            root = source
+        else:
+            program = compile_program(source, fn)
+            if program.error:
+                return None, program.error
+            if len(program.nodes) != 1:
+                raise ValueError("Batch evaluation takes a single expression.")
+            root = program.nodes[0]
+
+        self.context.budget = None
+        return BatchEvaluator().evaluate(root, columns, self.context)
+
+    def execute_stream(self, source: any, fn: str, chunk_size: int = DEFAULT_CHUNK_SIZE, engine: str = None) \
+            -> Iterator[Tuple[any, Error or None]]:
+        """
+        Execute the newline separated expressions read from `source`, a file
+        object or a memory-mapped buffer, one at a time. Generate the result
+        of every expression as soon as it is executed, so that files of any
+        size run in bounded memory.
+        """
+        interpreter = ENGINES[engine or self.engine]()
+        execution_context = self.context
+        execution_context.budget = None
+        symbol_table = self.variable_register.symbol_table
+
+        lexer = StreamLexer(source, fn, chunk_size)
+        for tokens, error in lexer.get_token_streams():
+            if error:
+                yield None, error
+                continue
+
+            parser = IterativeParser(tokens)
+            names = parser.symbol_table.names
+            # Slot in `symbol_table` of the identifiers parsed so far
+            slots = []
+            for ast in parser.parse_statements():
+                if ast.error:
+                    yield None, ast.error
+                    continue
+                if len(slots) < len(names):
+                    slots += symbol_table.intern_all(names[len(slots):])
+                # Other code may have run in this session since the last statement
+                execution_context.slots = slots
+                yield interpreter.run(interpreter.compile(ast.node), execution_context)
+            self.release_chunk(tokens.file)
+
+    def release_chunk(self, chunk: FileChunk) -> None:
+        """
+        Point the intervals of the variables set from a chunk of a stream
+        at chunks holding only their line, so that variables do not keep
+        every chunk of the stream alive.
+        """
+        line_files = {}
+        for value in self.variable_register.variables.values():
+            interval = value.interval
+            if interval is None or interval.file is not chunk:
+                continue
+            row, col = chunk.get_row_col(interval.start.idx)
+            line_start = interval.start.idx - col
+            line_file = line_files.get(row)
+            if line_file is None:
+                line_file = line_files[row] = FileChunk(chunk.name, chunk.get_line(row), row)
+            start = OffsetPosition(interval.start.idx - line_start, line_file)
+            end = OffsetPosition(interval.end.idx - line_start, line_file)
+            value.interval = Interval(start, end, line_file)
+
+    def execute_file(self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, engine: str = None) \
+            -> Iterator[Tuple[any, Error or None]]:
+        """
+        Execute a script file through a memory-mapped buffer.
+        See `execute_stream`.
+        """
+        with open(path, "rb") as f:
+            # Empty files cannot be memory-mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield from self.execute_stream(buffer, path, chunk_size, engine)
+
+    def save_snapshot(self, path: str, include_cache: bool = True) -> int:
+        """
+        Save the variables of this session to a snapshot file, along with
+        the code in `compile_cache` unless `include_cache` is False.
+        Return the number of variables saved. See `Snapshot`.
+        """
+        names = []
+        values = []
+        for name, value in self.variable_register.variables.items():
+            names.append(name)
+            values.append(value.value)
+        sources = compile_cache.keys() if include_cache else []
+        Snapshot(names, values, sources).save(path)
+        return len(names)
+
+    def load_snapshot(self, path: str, warm_cache: bool = True) -> int:
+        """
+        Replace the variables of this session with the ones saved in a
+        snapshot file, and compile the code saved with them into
+        `compile_cache` unless `warm_cache` is False. Return the number of
+        variables loaded.
+        """
+        snapshot = Snapshot.load(path)
+        register = self.variable_register
+        slots = register.symbol_table.intern_all(snapshot.names)
+        context = self.context
+        values = [None] * len(register.symbol_table)
+        for slot, value in zip(slots, snapshot.values):
+            values[slot] = Number(value, None, context)
+        register.values = values
+
+        if warm_cache:
+            for fn, raw, optimize in snapshot.sources:
+                compile_program(raw, fn, optimize)
+        return len(slots)
+
+
+# Session used by the functions below
+default_session = Session()
+variable_register = default_session.variable_register
+
+
+def execute(raw: str, fn: str, engine: str = ENGINE_VM, optimize: bool = True, budget: Budget = None,
+            stats: ExecutionStats = None):
+    """ Execute code in `default_session`. See `Session.execute`. """
+    return default_session.execute(raw, fn, engine, optimize, budget, stats)
+
+
+async def execute_async(raw: str, fn: str, optimize: bool = True, budget: Budget = None,
+                        slice_size: int = DEFAULT_SLICE_SIZE):
+    """ Execute code in `default_session`. See `Session.execute_async`. """
+    return await default_session.execute_async(raw, fn, optimize, budget, slice_size)
+
+
+def execute_batch(source: str or Node, columns: dict, fn: str = "<batch>") \
+        -> Tuple[BatchResult or None, Error or None]:
+    """ Evaluate an expression in `default_session`. See `Session.execute_batch`. """
+    return default_session.execute_batch(source, columns, fn)
+
+
+def execute_stream(source: any, fn: str, chunk_size: int = DEFAULT_CHUNK_SIZE, engine: str = ENGINE_VM) \
+        -> Iterator[Tuple[any, Error or None]]:
+    """ Execute a stream in `default_session`. See `Session.execute_stream`. """
+    return default_session.execute_stream(source, fn, chunk_size, engine)
+
+
+def execute_file(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, engine: str = ENGINE_VM) \
+        -> Iterator[Tuple[any, Error or None]]:
+    """ Execute a script file in `default_session`. See `Session.execute_file`. """
+    return default_session.execute_file(path, chunk_size, engine)
+
+
+def save_snapshot(path: str, include_cache: bool = True) -> int:
+    """ Save the variables of `default_session`. See `Session.save_snapshot`. """
+    return default_session.save_snapshot(path, include_cache)
+
+
+def load_snapshot(path: str, warm_cache: bool = True) -> int:
+    """ Load variables into `default_session`. See `Session.load_snapshot`. """
+    return default_session.load_snapshot(path, warm_cache)
+
+
+def run_compiled(chunk: List[Tuple[bytes, dict]]) -> List[Tuple[any, Error or None]]:
+    """
+    Run programs compiled to bytecode serialized with
+    `Bytecode.program_to_bytes`, each with its own variables set from a
+    dictionary mapping name of variable to value. Used by the worker
+    processes of `execute_many`.
+    """
+    vm = VirtualMachine()
+    # Dictionary mapping serialized program to the bytecode of its statements
+    loaded = {}
+    results = []
+    for data, bindings in chunk:
+        session = Session()
+        for name, value in bindings.items():
+            session.variable_register.set(name, Number(value))
+
+        statements = loaded.get(data)
+        if statements is None:
+            statements = loaded[data] = Bytecode.program_from_bytes(data)
+        value, error = None, None
+        for bytecode in statements:
+            value, error = vm.run(bytecode, session.context)
+            if error:
+                value = None
+                break
+        results.append((value, error))
+    return results
+
+
+def execute_many(sources: List[str], bindings: dict or List[dict] = None, workers: int = None,
+                 chunk_size: int = None, fn: str = "<batch>") -> List[Tuple[any, Error or None]]:
+    """
+    Execute many pieces of code, each in a new session, sharded across
+    `workers` processes (all CPUs by default). `bindings` maps name of
+    variable to value for every piece of code, or is a list holding one
+    such dictionary per piece of code. Return the value and the error of
+    every piece of code, in the same order as `sources`.
+
+    Code is compiled once in this process and sent to the workers as
+    bytecode, `chunk_size` pieces of code at a time, along with the
+    source code once per program for error messages. Code with a syntax
+    error is not sent at all. Compiled programs are not added to
+    `compile_cache`, so that a batch does not evict the programs of
+    sessions.
+    """
+    if bindings is None or isinstance(bindings, dict):
+        bindings = [bindings or {}] * len(sources)
+    if len(bindings) != len(sources):
+        raise ValueError("There must be as many bindings as sources.")
+    workers = workers or os.cpu_count() or 1
+
+    results = [None] * len(sources)
+    # Dictionary mapping code to its serialized bytecode, or to its syntax error
+    compiled = {}
+    # Index of every piece of code sent to the workers
+    indices = []
+    jobs = []
+    vm = VirtualMachine()
+    for idx, raw in enumerate(sources):
+        data = compiled.get(raw)
+        if data is None:
+            program = parse_program(raw, fn)
+            if program.error:
+                data = program.error
+            else:
+                data = Bytecode.program_to_bytes(program.file, program.get_compiled(ENGINE_VM, vm))
+            compiled[raw] = data
+        if isinstance(data, Error):
+            results[idx] = (None, data)
+            continue
+        indices.append(idx)
+        jobs.append((data, bindings[idx]))
 
-    # Get abstract syntax tree
-    parser = Parser(tokens)
-    ast = parser.parse()
-    if ast.error:
-        return None, ast.error
+    if chunk_size is None:
+        # A few chunks per worker, so that uneven chunks even out
+        chunk_size = max(1, math.ceil(len(jobs) / (workers * 4)))
+    chunks = [jobs[start:start + chunk_size] for start in range(0, len(jobs), chunk_size)]
 
-    # Interpret AST
-    interpreter = Interpreter()
-    execution_context = ExecutionContext("main program")
-    execution_context.variable_register = variable_register
-    result = interpreter.traverse(ast.node, execution_context)
+    if workers <= 1 or len(chunks) <= 1:
+        chunk_results = map(run_compiled, chunks)
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            chunk_results = list(executor.map(run_compiled, chunks))
 
-    return result.value, result.error
+    idx_iter = iter(indices)
+    for chunk_result in chunk_results:
+        for result in chunk_result:
+            results[next(idx_iter)] = result
+    return results
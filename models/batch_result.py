@@ -0,0 +1,24 @@
+from typing import List, Tuple
+
+from errors.error import Error
+
+
+class BatchResult:
+    """
+    The result of evaluating an expression over many rows of variable
+    values, see `BatchEvaluator`.
+    """
+    # Masked array holding the value of the expression for every row.
+    # Rows where the evaluation failed are masked.
+    values: any
+    # Errors raised by some of the rows, paired with the indices of
+    # these rows. Every failed row appears once, with the first error
+    # it raised.
+    errors: List[Tuple[Error, any]]
+
+    def __init__(self, values: any, errors: List[Tuple[Error, any]]):
+        self.values = values
+        self.errors = errors
+
+    def __repr__(self):
+        return f"BatchResult({self.values!r}, {len(self.errors)} errors)"
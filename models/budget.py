@@ -0,0 +1,84 @@
+import time
+
+from errors.budget_exceeded_error import BudgetExceededError
+from models.context import ExecutionContext
+from models.position import Interval
+from values.number import power_bit_length
+
+
+class Budget:
+    """
+    Limits on the resources used by one execution, so that untrusted code
+    cannot stall the interpreter. A limit of None means no limit.
+
+    As there are no loops, the number of nodes evaluated by a statement is
+    the size of its AST, and is charged before the statement runs.
+    Multiplications and powers, the only operations making integers grow
+    quickly, are checked before they are computed, from the bit lengths
+    of their operands. The deadline is checked along with both.
+    """
+    # Maximum number of AST nodes evaluated
+    max_nodes: int or None
+    # Maximum number of seconds an execution takes
+    timeout: float or None
+    # Maximum number of bits of an integer result
+    max_int_bits: int or None
+    # Number of nodes evaluated since `start`
+    nodes: int
+    # Value of `time.monotonic()` by which the execution must end
+    deadline: float or None
+
+    def __init__(self, max_nodes: int = None, timeout: float = None, max_int_bits: int = None):
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.max_int_bits = max_int_bits
+        self.start()
+
+    def start(self) -> None:
+        """ Reset the budget at the beginning of an execution. """
+        self.nodes = 0
+        self.deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+    def charge(self, nodes: int, interval: Interval, context: ExecutionContext) -> BudgetExceededError or None:
+        """ Account for `nodes` more nodes evaluated. """
+        self.nodes += nodes
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            return BudgetExceededError(f"Evaluated more than {self.max_nodes} nodes.", interval, context)
+        return self.check_time(interval, context)
+
+    def charge_statement(self, program: any, idx: int, context: ExecutionContext) -> BudgetExceededError or None:
+        """ Account for running statement `idx` of `program`. """
+        return self.charge(program.get_node_counts()[idx], program.nodes[idx].interval, context)
+
+    def exceeds_folds(self, program: any, idx: int) -> bool:
+        """
+        Return whether a product or power folded by the optimizer in
+        statement `idx` of `program` has more bits than allowed. Folded
+        values are not computed at run time, so such a statement must run
+        unoptimized, see `Program.get_unoptimized`.
+        """
+        if self.max_int_bits is None:
+            return False
+        return any(bits > self.max_int_bits for bits, _ in program.folds[idx])
+
+    def check_time(self, interval: Interval, context: ExecutionContext) -> BudgetExceededError or None:
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return BudgetExceededError(f"Ran for more than {self.timeout} seconds.", interval, context)
+        return None
+
+    def check_multiply(self, left: any, right: any, interval: Interval, context: ExecutionContext) \
+            -> BudgetExceededError or None:
+        if self.max_int_bits is not None and isinstance(left, int) and isinstance(right, int) and left and right:
+            # The product has at least this many bits
+            if left.bit_length() + right.bit_length() - 1 > self.max_int_bits:
+                return self.too_many_bits(interval, context)
+        return self.check_time(interval, context)
+
+    def check_power(self, left: any, right: any, interval: Interval, context: ExecutionContext) \
+            -> BudgetExceededError or None:
+        if self.max_int_bits is not None and power_bit_length(left, right) > self.max_int_bits:
+            return self.too_many_bits(interval, context)
+        return self.check_time(interval, context)
+
+    def too_many_bits(self, interval: Interval, context: ExecutionContext) -> BudgetExceededError:
+        return BudgetExceededError(f"Result would have more than {self.max_int_bits} bits.", interval, context)
@@ -0,0 +1,153 @@
+import marshal
+from array import array
+
+from models.position import File, Interval, OffsetPosition
+from models.symbol_table import Linkable
+
+################################
+# OPCODES
+################################
+# Push a constant
+LOAD_CONST = 0
+# Push the value of a variable
+LOAD_NAME = 1
+# Pop a value and assign it to a variable, push None
+STORE_NAME = 2
+# Pop the right then the left operand, push the result
+ADD = 3
+SUBTRACT = 4
+MULTIPLY = 5
+DIVIDE = 6
+POWER = 7
+# Replace the value on top of the stack with its negation
+NEGATE = 8
+# Pop the result of the program
+RETURN = 9
+# Copy the value on top of the stack into a temporary slot
+STORE_TEMP = 10
+# Push the value of a temporary slot
+LOAD_TEMP = 11
+
+OPCODE_NAMES = ("LOAD_CONST", "LOAD_NAME", "STORE_NAME", "ADD", "SUBTRACT", "MULTIPLY", "DIVIDE", "POWER",
+                "NEGATE", "RETURN", "STORE_TEMP", "LOAD_TEMP")
+
+# Version of the serialized form of bytecode
+BYTECODE_VERSION = 2
+
+
+class Bytecode(Linkable):
+    """
+    A program compiled for the stack-based virtual machine. Every
+    instruction is an opcode and an argument, which is an index into
+    `constants` or `names` when the opcode needs one. Identifiers are
+    linked to the symbol table of a session when the bytecode runs in it.
+
+    A side table maps every instruction to an interval of the source code:
+    for a binary operation, the right operand; for a variable assignment,
+    the assigned value; for other instructions, the node they come from.
+    """
+    # Opcode of every instruction
+    code: array
+    # Argument of every instruction
+    args: array
+    # Index of the first character of the interval of every instruction
+    starts: array
+    # Index of the character after the interval of every instruction
+    ends: array
+    # Numbers used by the program
+    constants: list
+    # Identifiers used by the program
+    names: list
+    # Number of temporary slots, holding the values of subexpressions
+    # used more than once
+    temp_count: int
+    # File that the program comes from
+    file: File
+
+    def __init__(self, file: File) -> None:
+        self.code = array("B")
+        self.args = array("l")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.constants = []
+        self.names = []
+        self.temp_count = 0
+        self.file = file
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def emit(self, opcode: int, arg: int, start: int, end: int) -> None:
+        self.code.append(opcode)
+        self.args.append(arg)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def get_interval(self, ip: int) -> Interval:
+        start = OffsetPosition(self.starts[ip], self.file)
+        end = OffsetPosition(self.ends[ip], self.file)
+        return Interval(start, end, self.file)
+
+    def to_bytes(self) -> bytes:
+        return marshal.dumps((BYTECODE_VERSION, self.file.name, self.file.content) + self.to_fields())
+
+    @staticmethod
+    def from_bytes(data: bytes):
+        fields = marshal.loads(data)
+        if fields[0] != BYTECODE_VERSION:
+            raise ValueError(f"Unsupported bytecode version {fields[0]}.")
+        return Bytecode.from_fields(fields[3:], File(fields[1], fields[2]))
+
+    @staticmethod
+    def program_to_bytes(file: File, statements: list) -> bytes:
+        """
+        Serialize the bytecode of every statement of a program coming from
+        `file`. The source code is stored once, not once per statement.
+        """
+        return marshal.dumps((
+            BYTECODE_VERSION, file.name, file.content, tuple(bytecode.to_fields() for bytecode in statements),
+        ))
+
+    @staticmethod
+    def program_from_bytes(data: bytes) -> list:
+        """ Return the bytecode of every statement serialized by `program_to_bytes`. """
+        fields = marshal.loads(data)
+        if fields[0] != BYTECODE_VERSION:
+            raise ValueError(f"Unsupported bytecode version {fields[0]}.")
+        _, name, content, statements = fields
+        file = File(name, content)
+        return [Bytecode.from_fields(statement, file) for statement in statements]
+
+    def to_fields(self) -> tuple:
+        """ Return the serializable fields of this bytecode, except its file. """
+        return (
+            self.code.tobytes(), self.args.tobytes(), self.starts.tobytes(), self.ends.tobytes(),
+            tuple(self.constants), tuple(self.names), self.temp_count,
+        )
+
+    @staticmethod
+    def from_fields(fields: tuple, file: File):
+        code, args, starts, ends, constants, names, temp_count = fields
+        bytecode = Bytecode(file)
+        bytecode.code.frombytes(code)
+        bytecode.args.frombytes(args)
+        bytecode.starts.frombytes(starts)
+        bytecode.ends.frombytes(ends)
+        bytecode.constants = list(constants)
+        bytecode.names = list(names)
+        bytecode.temp_count = temp_count
+        return bytecode
+
+    def __repr__(self) -> str:
+        lines = []
+        for ip in range(len(self.code)):
+            opcode = self.code[ip]
+            line = f"{ip:4} {OPCODE_NAMES[opcode]}"
+            if opcode == LOAD_CONST:
+                line += f" {self.constants[self.args[ip]]!r}"
+            elif opcode in (LOAD_NAME, STORE_NAME):
+                line += f" {self.names[self.args[ip]]}"
+            elif opcode in (LOAD_TEMP, STORE_TEMP):
+                line += f" {self.args[ip]}"
+            lines.append(line)
+        return "\n".join(lines)
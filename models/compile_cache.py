@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+
+from models.program import Program
+
+# Eviction policies
+EVICT_LRU = "lru"
+EVICT_FIFO = "fifo"
+
+
+class CompileCache:
+    """
+    A bounded cache mapping code to its program, so that code executed
+    over and over again is only lexed and parsed once. Programs with
+    errors are cached as well. The cache can be shared between threads.
+    """
+    # Maximum number of programs to keep, 0 disables the cache
+    max_size: int
+    # Which program to evict when the cache is full: the least recently
+    # used one (EVICT_LRU), or the oldest one (EVICT_FIFO)
+    eviction: str
+    # Number of lookups finding a program
+    hits: int
+    # Number of lookups not finding a program
+    misses: int
+    # Number of programs evicted to make room for others
+    evictions: int
+    # Lock held while reading or updating the cache
+    lock: threading.Lock
+
+    def __init__(self, max_size: int = 1024, eviction: str = EVICT_LRU):
+        if eviction not in (EVICT_LRU, EVICT_FIFO):
+            raise ValueError(f"Unknown eviction policy '{eviction}'.")
+        self.max_size = max_size
+        self.eviction = eviction
+        self.programs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.programs)
+
+    def get(self, key: any) -> Program or None:
+        with self.lock:
+            program = self.programs.get(key)
+            if program is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if self.eviction == EVICT_LRU:
+                self.programs.move_to_end(key)
+            return program
+
+    def put(self, key: any, program: Program) -> None:
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.programs[key] = program
+            while len(self.programs) > self.max_size:
+                self.programs.popitem(last=False)
+                self.evictions += 1
+
+    def keys(self) -> list:
+        """ Return the key of every program, in the order they would be evicted. """
+        with self.lock:
+            return list(self.programs)
+
+    def clear(self) -> None:
+        """ Remove all programs and reset the counters. """
+        with self.lock:
+            self.programs.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
@@ -16,9 +16,31 @@ class ExecutionContext:
     parent_interval: Interval
     # Variable table
     variable_register: VariableRegister or None
+    # `Budget` limiting the resources used by the execution, or None
+    budget: any
+    # Slot in the symbol table of `variable_register` of every identifier
+    # of the nodes being run, indexed by the slot of the identifier in
+    # the nodes, see `Linkable`
+    slots: list or None
+    # `ExecutionStats` counting the `Number` objects allocated in this
+    # context, or None
+    stats: any
 
     def __init__(self, name: str, parent: any = None, parent_interval: Interval = None):
         self.name = name
         self.parent_interval = parent_interval
         self.parent = parent
         self.variable_register = None
+        self.budget = None
+        self.slots = None
+        self.stats = None
+
+    def __getstate__(self) -> dict:
+        # Variables are only meaningful in the process running the code, so
+        # they are left out when errors and values are sent to another one
+        state = self.__dict__.copy()
+        state["variable_register"] = None
+        state["budget"] = None
+        state["slots"] = None
+        state["stats"] = None
+        return state
@@ -0,0 +1,56 @@
+from typing import Dict
+
+# Phases of an execution, in order
+PHASE_LEX = "lex"
+PHASE_PARSE = "parse"
+PHASE_OPTIMIZE = "optimize"
+PHASE_COMPILE = "compile"
+PHASE_RUN = "run"
+PHASES = (PHASE_LEX, PHASE_PARSE, PHASE_OPTIMIZE, PHASE_COMPILE, PHASE_RUN)
+
+
+class ExecutionStats:
+    """
+    Measurements of one execution, filled in when passed to
+    `Session.execute`. Nothing is measured unless it is asked for, so
+    executions without stats pay nothing for them.
+
+    Lexing, parsing and optimizing only happen when the program is not
+    found in the compile cache, in which case `cached` is True and their
+    times are 0.
+    """
+    # Seconds spent in every phase, see `PHASES`
+    phase_times: Dict[str, float]
+    # Whether the program was found in the compile cache
+    cached: bool
+    # Number of tokens in the code, 0 if the program was cached
+    token_count: int
+    # Dictionary mapping name of node type to the number of such nodes
+    # in the ASTs of the program, after optimization
+    node_counts: Dict[str, int]
+    # Number of `Number` objects allocated while running the program,
+    # counted by the execution context the program runs in
+    number_allocations: int
+
+    def __init__(self):
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.cached = False
+        self.token_count = 0
+        self.node_counts = {}
+        self.number_allocations = 0
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        self.phase_times[phase] += seconds
+
+    def __str__(self) -> str:
+        def format_counts(counts: dict) -> str:
+            return ", ".join(f"{name} {count}" for name, count in sorted(counts.items())) or "none"
+
+        total = sum(self.phase_times.values())
+        phases = ", ".join(f"{phase} {seconds * 1000:.3f}" for phase, seconds in self.phase_times.items())
+        tokens = "cached program" if self.cached else str(self.token_count)
+        return f"Time (ms): {phases}, total {total * 1000:.3f}\n" \
+               f"Tokens: {tokens}\n" \
+               f"AST nodes: {format_counts(self.node_counts)}\n" \
+               f"Number allocations: {self.number_allocations}"
+
@@ -0,0 +1,120 @@
+import marshal
+from array import array
+
+from errors.interpret_error import InterpretError
+from errors.raised_error import RaisedError
+from models.context import ExecutionContext
+from models.position import File, Interval, OffsetPosition
+from models.symbol_table import Linkable
+from models.variable_register import VariableRegister
+from values.number import Number
+
+# Version of the serialized form of generated code
+GENERATED_CODE_VERSION = 4
+
+
+class Missing:
+    """ The value of a variable that is not defined. """
+
+    def __repr__(self) -> str:
+        return "<missing>"
+
+
+MISSING = Missing()
+
+
+class GeneratedCode(Linkable):
+    """
+    A program translated into a Python function, see `PythonCodeGenerator`.
+    The function takes a variable register, the slot in its symbol table
+    of every identifier in `names`, and an execution context, and returns
+    the value of the program as a plain Python number.
+
+    A side table maps indices used in the function to intervals of the
+    source code, so that errors raised by the function have the same
+    intervals as the errors of `Interpreter`. The interval at index 0 is
+    the interval of the whole program.
+    """
+    # Python source code of the function
+    source: str
+    # Compiled Python source code, a code object
+    code: any
+    # Constants that cannot be written as Python literals
+    constants: tuple
+    # Identifiers used by the program
+    names: tuple
+    # Index of the first character of every interval in the side table
+    starts: array
+    # Index of the character after every interval in the side table
+    ends: array
+    # File that the program comes from
+    file: File
+
+    def __init__(self, source: str, code: any, constants: tuple, names: tuple, starts: array, ends: array,
+                 file: File):
+        self.source = source
+        self.code = code
+        self.constants = constants
+        self.names = names
+        self.starts = starts
+        self.ends = ends
+        self.file = file
+
+        namespace = {
+            "_MISSING": MISSING,
+            "_constants": constants,
+            "_load": self.load,
+            "_store": self.store,
+            "_unknown_identifier": self.unknown_identifier,
+            "_divide_by_zero": self.divide_by_zero,
+            "_check_multiply": self.check_multiply,
+            "_check_power": self.check_power,
+        }
+        exec(code, namespace)
+        self.function = namespace["program"]
+
+    def get_interval(self, idx: int) -> Interval:
+        start = OffsetPosition(self.starts[idx], self.file)
+        end = OffsetPosition(self.ends[idx], self.file)
+        return Interval(start, end, self.file)
+
+    @staticmethod
+    def load(register: VariableRegister, slot: int) -> any:
+        var_value = register.lookup(slot)
+        return MISSING if var_value is None else var_value.value
+
+    def store(self, register: VariableRegister, slot: int, value: any, idx: int, context: ExecutionContext) -> None:
+        if value is not None:
+            value = Number(value, self.get_interval(idx), context)
+        register.store(slot, value)
+
+    def unknown_identifier(self, idx: int, name: str, context: ExecutionContext) -> None:
+        raise RaisedError(InterpretError(f"Unknown identifier '{name}'.", self.get_interval(idx), context))
+
+    def divide_by_zero(self, idx: int, context: ExecutionContext) -> None:
+        raise RaisedError(InterpretError("Cannot divide by 0.", self.get_interval(idx), context))
+
+    def check_multiply(self, budget: any, left: any, right: any, idx: int, context: ExecutionContext) -> None:
+        error = budget.check_multiply(left, right, self.get_interval(idx), context)
+        if error is not None:
+            raise RaisedError(error)
+
+    def check_power(self, budget: any, left: any, right: any, idx: int, context: ExecutionContext) -> None:
+        error = budget.check_power(left, right, self.get_interval(idx), context)
+        if error is not None:
+            raise RaisedError(error)
+
+    def to_bytes(self) -> bytes:
+        return marshal.dumps((
+            GENERATED_CODE_VERSION,
+            self.file.name, self.file.content,
+            self.source, self.code, self.constants, self.names, self.starts.tobytes(), self.ends.tobytes(),
+        ))
+
+    @staticmethod
+    def from_bytes(data: bytes):
+        fields = marshal.loads(data)
+        if fields[0] != GENERATED_CODE_VERSION:
+            raise ValueError(f"Unsupported generated code version {fields[0]}.")
+        _, name, content, source, code, constants, names, starts, ends = fields
+        return GeneratedCode(source, code, constants, names, array("q", starts), array("q", ends), File(name, content))
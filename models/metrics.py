@@ -0,0 +1,121 @@
+import time
+from typing import List
+
+from constants import NEW_LINE
+
+# Upper bounds of the buckets of latency histograms, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    A histogram counting observed values in buckets, rendered in the
+    Prometheus text format: every bucket counts the values less than or
+    equal to its upper bound.
+    """
+    # Upper bound of every bucket, in increasing order
+    bounds: tuple
+    # Number of values falling in every bucket, and above the last bound
+    counts: List[int]
+    # Sum of all values
+    total: float
+    # Number of values
+    count: int
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        idx = 0
+        while idx < len(self.bounds) and value > self.bounds[idx]:
+            idx += 1
+        self.counts[idx] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        separator = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.total}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class ServerMetrics:
+    """
+    Counters and latency histograms of an `EvaluationServer`. Only
+    updated from the event loop, so no locking is needed.
+    """
+    # Dictionary mapping outcome of a request to the number of requests
+    requests: dict
+    # Dictionary mapping outcome of a request to the histogram of the
+    # time from receiving to answering the request
+    latencies: dict
+    # Number of connections open now, and ever opened
+    connections: int
+    connections_total: int
+    # Number of evaluations submitted to the executor and not done yet
+    in_flight: int
+    # Value of `time.monotonic()` when the server started
+    started: float
+
+    def __init__(self):
+        self.requests = {}
+        self.latencies = {}
+        self.connections = 0
+        self.connections_total = 0
+        self.in_flight = 0
+        self.started = time.monotonic()
+
+    def observe_request(self, outcome: str, latency: float) -> None:
+        self.requests[outcome] = self.requests.get(outcome, 0) + 1
+        histogram = self.latencies.get(outcome)
+        if histogram is None:
+            histogram = self.latencies[outcome] = Histogram()
+        histogram.observe(latency)
+
+    def render(self, sessions: int) -> str:
+        lines = [
+            "# HELP jimmy_requests_total Requests answered, by outcome.",
+            "# TYPE jimmy_requests_total counter",
+        ]
+        lines += [f'jimmy_requests_total{{outcome="{outcome}"}} {count}' for outcome, count in self.requests.items()]
+        lines += [
+            "# HELP jimmy_request_latency_seconds Time from receiving to answering a request, by outcome.",
+            "# TYPE jimmy_request_latency_seconds histogram",
+        ]
+        for outcome, histogram in self.latencies.items():
+            lines += histogram.render("jimmy_request_latency_seconds", f'outcome="{outcome}"')
+
+        uptime = time.monotonic() - self.started
+        total = sum(self.requests.values())
+        lines += [
+            "# HELP jimmy_requests_per_second Requests answered per second since the server started.",
+            "# TYPE jimmy_requests_per_second gauge",
+            f"jimmy_requests_per_second {total / uptime if uptime > 0 else 0.0}",
+            "# HELP jimmy_uptime_seconds Time since the server started.",
+            "# TYPE jimmy_uptime_seconds counter",
+            f"jimmy_uptime_seconds {uptime}",
+            "# HELP jimmy_connections Connections open now.",
+            "# TYPE jimmy_connections gauge",
+            f"jimmy_connections {self.connections}",
+            "# HELP jimmy_connections_total Connections ever opened.",
+            "# TYPE jimmy_connections_total counter",
+            f"jimmy_connections_total {self.connections_total}",
+            "# HELP jimmy_evaluations_in_flight Evaluations submitted to the executor and not done yet.",
+            "# TYPE jimmy_evaluations_in_flight gauge",
+            f"jimmy_evaluations_in_flight {self.in_flight}",
+            "# HELP jimmy_sessions Sessions kept by the server.",
+            "# TYPE jimmy_sessions gauge",
+            f"jimmy_sessions {sessions}",
+        ]
+        return NEW_LINE.join(lines) + NEW_LINE
@@ -1,4 +1,5 @@
-from typing import Optional
+from bisect import bisect_right
+from typing import Optional, List, Tuple
 
 from constants import *
 
@@ -8,10 +9,65 @@ class File:
     name: str
     # Content in the file, use the character '\n' for newline
     content: str
+    # Index of the first character of every line, built on first use
+    _line_starts: Optional[List[int]]
 
     def __init__(self, name: str, content: str):
         self.name = name
         self.content = content
+        self._line_starts = None
+
+    @property
+    def line_starts(self) -> List[int]:
+        if self._line_starts is None:
+            content = self.content
+            line_starts = [0]
+            idx = content.find(NEW_LINE)
+            while idx >= 0:
+                line_starts.append(idx + 1)
+                idx = content.find(NEW_LINE, idx + 1)
+            self._line_starts = line_starts
+        return self._line_starts
+
+    def get_row_col(self, idx: int) -> Tuple[int, int]:
+        """
+        Return the row and column of the character at index `idx`,
+        looked up in the line index of this file.
+        """
+        line_starts = self.line_starts
+        row = bisect_right(line_starts, idx) - 1
+        return row, idx - line_starts[row]
+
+    def get_line(self, row: int) -> str:
+        """
+        Return the line at row `row` of this file, without the newline.
+        """
+        line_starts = self.line_starts
+        start = line_starts[row]
+        end = line_starts[row + 1] - 1 if row + 1 < len(line_starts) else len(self.content)
+        return self.content[start:end]
+
+
+class FileChunk(File):
+    """
+    A piece of a file made of complete lines, used when a file is too
+    large to be held in memory at once. Indices are relative to the
+    start of the chunk, while rows are counted from the start of the
+    file.
+    """
+    # Row of the first line of this chunk in the file
+    first_row: int
+
+    def __init__(self, name: str, content: str, first_row: int = 0):
+        super().__init__(name, content)
+        self.first_row = first_row
+
+    def get_row_col(self, idx: int) -> Tuple[int, int]:
+        row, col = super().get_row_col(idx)
+        return row + self.first_row, col
+
+    def get_line(self, row: int) -> str:
+        return super().get_line(row - self.first_row)
 
 
 class Position:
@@ -47,6 +103,35 @@ class Position:
         return Position(self.idx, self.row, self.col)
 
 
+class OffsetPosition(Position):
+    """
+    Represent a position by its index only. The row and column are
+    looked up in the line index of the file when they are needed,
+    which is usually only when an error is reported.
+    """
+    # File that this position resides in
+    file: File
+
+    def __init__(self, idx: int, file: File) -> None:
+        self.idx = idx
+        self.file = file
+
+    @property
+    def row(self) -> int:
+        return self.file.get_row_col(self.idx)[0]
+
+    @property
+    def col(self) -> int:
+        return self.file.get_row_col(self.idx)[1]
+
+    def next(self, curr: str = None):
+        self.idx += 1
+        return self
+
+    def copy(self):
+        return OffsetPosition(self.idx, self.file)
+
+
 class Interval:
     """
     Represent an interval containing a starting position and an ending
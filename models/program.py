@@ -0,0 +1,118 @@
+from typing import Dict, Generator, List
+
+from errors.error import Error
+from models.position import File
+from models.symbol_table import Linkable
+from nodes.node import Node
+from nodes.node_arena import NodeArena
+
+
+class Program(Linkable):
+    """
+    A piece of code that has been lexed and parsed, ready to be executed.
+    A program does not depend on any variable register, so it can be
+    executed any number of times, in any context, including from several
+    threads at once. Compiled forms are never modified once built.
+
+    Variables in the trees refer to their identifier by its index in
+    `names`, and are linked to the symbol table of a session before
+    running in it.
+    """
+    # File the program comes from
+    file: File
+    # Roots of the abstract syntax trees of the statements in the
+    # program, empty if the code has an error
+    nodes: List[Node]
+    # Error raised when lexing or parsing the code
+    error: Error or None
+    # Identifiers used by the program, indexed by their slot in the nodes
+    names: List[str]
+    # Dictionary mapping name of execution engine to the form of the
+    # program compiled by that engine
+    compiled: dict
+    # Number of nodes in the AST of every statement, computed on first use
+    node_counts: List[int] or None
+    # Products and powers of integers folded by the optimizer in every
+    # statement, see `Optimizer.folds`
+    folds: List[list]
+    # Dictionary mapping index of statement to the root of its AST before
+    # optimizing, for statements where the optimizer folded a product or
+    # a power of integers
+    unoptimized: Dict[int, Node]
+
+    def __init__(self, file: File, nodes: List[Node], error: Error or None = None, folds: List[list] = None,
+                 unoptimized: Dict[int, Node] = None, names: List[str] = None):
+        self.file = file
+        self.nodes = nodes
+        self.error = error
+        self.names = names or []
+        self.compiled = {}
+        self.node_counts = None
+        self.folds = folds or [[] for _ in nodes]
+        self.unoptimized = unoptimized or {}
+
+    def get_compiled(self, engine_name: str, interpreter: any) -> list:
+        """
+        Return the statements compiled by `interpreter`, compiling them
+        on first use.
+        """
+        code = self.compiled.get(engine_name)
+        if code is None:
+            code = self.compiled[engine_name] = [interpreter.compile(node) for node in self.nodes]
+        return code
+
+    def get_compiled_sliced(self, engine_name: str, interpreter: any, slice_size: int) \
+            -> Generator[None, None, list]:
+        """
+        Return the same statements as `get_compiled`, compiled by an
+        engine with a `compile_sliced` method generating None between
+        slices of about `slice_size` nodes, like `VirtualMachine`. None is
+        generated between the slices, and between statements of more than
+        `slice_size` nodes in total.
+        """
+        code = self.compiled.get(engine_name)
+        if code is None:
+            code = []
+            node_counts = self.get_node_counts()
+            # Number of nodes compiled since the last pause
+            compiled = 0
+            for idx, node in enumerate(self.nodes):
+                code.append((yield from interpreter.compile_sliced(node, slice_size)))
+                compiled += node_counts[idx]
+                if compiled >= slice_size:
+                    compiled = 0
+                    yield
+            self.compiled[engine_name] = code
+        return code
+
+    def get_unoptimized(self, engine_name: str, interpreter: any, idx: int) -> any:
+        """
+        Return statement `idx` compiled by `interpreter` from its AST before
+        optimizing, compiling it on first use. Run instead of the optimized
+        statement when a folded product or power is over budget, so that
+        the budget error is reported where the value is computed, after
+        any error coming before it.
+        """
+        key = (engine_name, idx)
+        code = self.compiled.get(key)
+        if code is None:
+            code = self.compiled[key] = interpreter.compile(self.unoptimized[idx])
+        return code
+
+    def get_node_counts(self) -> List[int]:
+        """
+        Return the number of nodes in the AST of every statement, which is
+        the number of nodes evaluated when running it.
+        """
+        node_counts = self.node_counts
+        if node_counts is None:
+            node_counts = []
+            for root in self.nodes:
+                count = 0
+                stack = [root]
+                while stack:
+                    count += 1
+                    stack.extend(NodeArena.get_children(stack.pop()))
+                node_counts.append(count)
+            self.node_counts = node_counts
+        return node_counts
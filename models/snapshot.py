@@ -0,0 +1,85 @@
+import marshal
+import mmap
+import os
+import tempfile
+from typing import List
+
+# Version of the serialized form of snapshots
+SNAPSHOT_VERSION = 1
+# Types of the values of variables
+VALUE_TYPES = (int, float, complex)
+
+
+class Snapshot:
+    """
+    The variables of a session and the code in the compile cache, saved so
+    that a new process can pick up where another one left off without
+    executing the code defining the variables again. Variables are saved
+    by name, as slots are only meaningful within one process, and values
+    are saved as plain numbers. Programs are saved as their code, and
+    compiled again when the snapshot is loaded.
+    """
+    # Name of every variable
+    names: List[str]
+    # Value of every variable in `names`
+    values: list
+    # Key in the compile cache of every program, least recently used first
+    sources: list
+
+    def __init__(self, names: List[str], values: list, sources: list = None):
+        self.names = names
+        self.values = values
+        self.sources = sources or []
+
+    def to_bytes(self) -> bytes:
+        return marshal.dumps((SNAPSHOT_VERSION, self.names, self.values, self.sources))
+
+    @staticmethod
+    def from_bytes(data: bytes or mmap.mmap):
+        try:
+            fields = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            raise ValueError("Not a snapshot.")
+        version = fields[0] if isinstance(fields, tuple) and fields else None
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}.")
+        if len(fields) != 4:
+            raise ValueError("Not a snapshot.")
+        _, names, values, sources = fields
+        if not isinstance(names, list) or not isinstance(values, list) or len(names) != len(values):
+            raise ValueError("Snapshot must have as many values as names.")
+        if not all(type(name) is str for name in names):
+            raise ValueError("Snapshot has a name that is not a string.")
+        if not all(type(value) in VALUE_TYPES for value in values):
+            raise ValueError("Snapshot has a value that is not a number.")
+        if not isinstance(sources, list) or not all(
+                isinstance(source, tuple) and len(source) == 3 and type(source[0]) is str and
+                type(source[1]) is str and type(source[2]) is bool for source in sources):
+            raise ValueError("Snapshot has bad code.")
+        return Snapshot(names, values, sources)
+
+    def save(self, path: str) -> None:
+        """
+        Write the snapshot to a new file in the same directory, then move
+        it over `path`, so that `path` is replaced at once, and concurrent
+        saves never write to the same file.
+        """
+        directory, name = os.path.split(path)
+        f = tempfile.NamedTemporaryFile("wb", dir=directory or ".", prefix=f"{name}.", suffix=".tmp", delete=False)
+        try:
+            with f:
+                f.write(self.to_bytes())
+            os.replace(f.name, path)
+        except BaseException:
+            os.remove(f.name)
+            raise
+
+    @staticmethod
+    def load(path: str):
+        """ Read a snapshot from a file through a memory-mapped buffer. """
+        with open(path, "rb") as f:
+            # Empty files cannot be memory-mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError("Not a snapshot.")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return Snapshot.from_bytes(buffer)
@@ -0,0 +1,83 @@
+import threading
+
+
+class SymbolTable:
+    """
+    A symbol table interns identifiers, giving every distinct identifier
+    a slot. Slots are small integers indexing a list, so that looking up
+    a variable does not hash its name. Interning is thread-safe.
+
+    There is no table shared by the whole process, so that no table grows
+    with every identifier ever seen. A parser gives the identifiers of the
+    code it parses slots in a table of its own, and the variable registers
+    of a session share another one. `Linkable` translates the slots of
+    the former into slots of the latter.
+    """
+    # Dictionary mapping identifier to slot
+    slots: dict
+    # Identifier of every slot
+    names: list
+    # Lock held while adding an identifier
+    lock: threading.Lock
+
+    def __init__(self):
+        self.slots = {}
+        self.names = []
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """ Return the slot of an identifier, adding it if needed. """
+        slot = self.slots.get(name)
+        if slot is None:
+            with self.lock:
+                slot = self.slots.get(name)
+                if slot is None:
+                    self.names.append(name)
+                    slot = self.slots[name] = len(self.names) - 1
+        return slot
+
+    def intern_all(self, names: list) -> list:
+        """ Return the slot of every identifier in `names`, adding them if needed. """
+        with self.lock:
+            slots = self.slots
+            all_names = self.names
+            result = []
+            for name in names:
+                slot = slots.get(name)
+                if slot is None:
+                    all_names.append(name)
+                    slot = slots[name] = len(all_names) - 1
+                result.append(slot)
+            return result
+
+    def get_slot(self, name: str) -> int or None:
+        return self.slots.get(name)
+
+    def get_name(self, slot: int) -> str:
+        return self.names[slot]
+
+
+class Linkable:
+    """
+    Compiled code referring to identifiers by their index in `names`.
+    Before it runs in a session, the code is linked to the symbol table
+    of the session, giving the slot of every identifier in that table.
+    The slots of the last table are kept, as code usually runs in the
+    same session again.
+    """
+    # Identifiers used by the code
+    names: list
+    # Last symbol table the code was linked to, and the slot in that table
+    # of every identifier in `names`, or None
+    linked: tuple or None = None
+
+    def get_slots(self, symbol_table: SymbolTable) -> list:
+        """ Return the slot in `symbol_table` of every identifier in `names`. """
+        linked = self.linked
+        if linked is None or linked[0] is not symbol_table:
+            # Replaced as a whole, so that other threads see either link
+            linked = self.linked = (symbol_table, symbol_table.intern_all(self.names))
+        return linked[1]
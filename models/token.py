@@ -19,8 +19,20 @@ TOKEN_IDENTIFIER = "IDENTIFIER"
 TOKEN_KEYWORD = "KEYWORD"
 TOKEN_ASSIGNMENT = "ASSIGNMENT"
 
+TOKEN_NEWLINE = "NEWLINE"
 TOKEN_EOF = "EOF"
 
+# Token types in the order of their compact integer codes, used by
+# token streams to store token types as small integers.
+TOKEN_TYPES = (
+    TOKEN_INT, TOKEN_FLOAT,
+    TOKEN_PLUS, TOKEN_MINUS, TOKEN_MULTIPLY, TOKEN_DIVISION, TOKEN_POWER,
+    TOKEN_LBRACKET, TOKEN_RBRACKET,
+    TOKEN_IDENTIFIER, TOKEN_KEYWORD, TOKEN_ASSIGNMENT,
+    TOKEN_NEWLINE, TOKEN_EOF,
+)
+TOKEN_CODES = {t_type: code for code, t_type in enumerate(TOKEN_TYPES)}
+
 TOKEN_MAP = {
     "+": TOKEN_PLUS,
     "-": TOKEN_MINUS,
@@ -0,0 +1,84 @@
+from array import array
+from typing import List
+
+from models.position import File, Interval, OffsetPosition
+from models.token import *
+
+
+class TokenStream:
+    """
+    A compact representation of the tokens of a file. Instead of one
+    `Token` object per token, token types are stored as small integer
+    codes (see `TOKEN_CODES`) and positions as character offsets, in
+    parallel arrays. Token values live in a side list.
+
+    `Token` objects are only materialized on request, e.g. when a token
+    becomes part of the abstract syntax tree or for debugging.
+    """
+    # Token type codes
+    types: array
+    # Token values, None for tokens without a value
+    values: list
+    # Index of the first character of every token
+    starts: array
+    # Index of the character after every token. For single character
+    # tokens, this is the same as the start index.
+    ends: array
+    # File that the tokens reside in
+    file: File
+
+    @staticmethod
+    def from_tokens(tokens: List[Token], file: File = None):
+        if file is None and len(tokens) > 0:
+            file = tokens[0].interval.file
+        stream = TokenStream(file)
+        for token in tokens:
+            stream.append(TOKEN_CODES[token.type], token.value,
+                          token.interval.start.idx, token.interval.end.idx)
+        return stream
+
+    def __init__(self, file: File) -> None:
+        self.types = array("B")
+        self.values = []
+        self.starts = array("q")
+        self.ends = array("q")
+        self.file = file
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def append(self, code: int, value: any, start: int, end: int) -> None:
+        self.types.append(code)
+        self.values.append(value)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def extend(self, other) -> None:
+        """
+        Append the tokens of `other`, coming right after the tokens of
+        this stream in the same file, in place of the EOF token ending
+        this stream.
+        """
+        del self.types[-1], self.values[-1], self.starts[-1], self.ends[-1]
+        self.types.extend(other.types)
+        self.values.extend(other.values)
+        self.starts.extend(other.starts)
+        self.ends.extend(other.ends)
+
+    def get_type(self, idx: int) -> str:
+        return TOKEN_TYPES[self.types[idx]]
+
+    def get_interval(self, idx: int) -> Interval:
+        start = OffsetPosition(self.starts[idx], self.file)
+        end_idx = self.ends[idx]
+        end = start if end_idx == start.idx else OffsetPosition(end_idx, self.file)
+        return Interval(start, end, self.file)
+
+    def get_token(self, idx: int) -> Token:
+        return Token(TOKEN_TYPES[self.types[idx]], self.values[idx], self.get_interval(idx))
+
+    def to_tokens(self) -> List[Token]:
+        return [self.get_token(idx) for idx in range(len(self))]
+
+    def __repr__(self) -> str:
+        return repr(self.to_tokens())
@@ -1,7 +1,14 @@
+from models.symbol_table import SymbolTable
+
 
 class VariableRegister:
-    # Dictionary mapping name of variable to value
-    variables: dict
+    # Value of every variable defined in this register, indexed by the
+    # slot of its name in `symbol_table`, None for the other slots. Only
+    # holds the identifiers linked in this session, see `Linkable`.
+    values: list
+    # Symbol table giving the slots of identifiers, shared with the
+    # parent register
+    symbol_table: SymbolTable
     # Parent variable register. If the variables in this register
     # is meant to exist in the global level, then parent would be
     # None. If the variable register stores variables in a function
@@ -9,18 +16,53 @@ class VariableRegister:
     # register.
     parent: any
 
-    def __init__(self):
-        self.variables = {}
-        self.parent = None
+    def __init__(self, parent: any = None):
+        self.values = []
+        self.parent = parent
+        self.symbol_table = SymbolTable() if parent is None else parent.symbol_table
+
+    @property
+    def variables(self) -> dict:
+        """ Dictionary mapping name of variable to value, in this register only. """
+        get_name = self.symbol_table.get_name
+        return {get_name(slot): val for slot, val in enumerate(self.values) if val is not None}
 
     def get(self, name: str) -> any:
-        val = self.variables.get(name, None)
-        if val is None and self.parent is not None:
-            return self.parent.get
-        return val
+        slot = self.symbol_table.get_slot(name)
+        return None if slot is None else self.lookup(slot)
 
     def set(self, name: str, val: any) -> None:
-        self.variables[name] = val
+        self.store(self.symbol_table.intern(name), val)
 
     def remove(self, name: str):
-        del self.variables[name]
+        slot = self.symbol_table.get_slot(name)
+        if slot is None or slot >= len(self.values) or self.values[slot] is None:
+            raise KeyError(name)
+        self.values[slot] = None
+
+    def lookup(self, slot: int) -> any:
+        """
+        Return the value of the variable in `slot` in the nearest register
+        defining it, or None. Variables of this register are found by
+        indexing a list, parents are only searched for variables not
+        defined here.
+
+        The register defining a variable is found here rather than when
+        linking: the same linked code runs again after assignments have
+        defined variables in registers closer to it, and registers sharing
+        a symbol table give a variable the same slot at every depth.
+        """
+        values = self.values
+        value = values[slot] if slot < len(values) else None
+        if value is None and self.parent is not None:
+            return self.parent.lookup(slot)
+        return value
+
+    def store(self, slot: int, val: any) -> None:
+        """ Set the variable in `slot`, or remove it if `val` is None. """
+        values = self.values
+        if slot >= len(values):
+            if val is None:
+                return
+            values.extend([None] * (slot + 1 - len(values)))
+        values[slot] = val
@@ -0,0 +1,209 @@
+from array import array
+
+from models.position import File, Interval, OffsetPosition
+from models.token import *
+from nodes.bin_op_node import BinOpNode
+from nodes.node import Node
+from nodes.number_node import NumberNode
+from nodes.unary_op_node import UnaryOpNode
+from nodes.var_access_node import VarAccessNode
+from nodes.var_assign_node import VarAssignNode
+from values.number import value_key
+
+################################
+# OPCODES OF ARENA NODES
+################################
+OP_NUMBER = 0
+OP_ADD = 1
+OP_SUBTRACT = 2
+OP_MULTIPLY = 3
+OP_DIVIDE = 4
+OP_POWER = 5
+OP_NEGATE = 6
+OP_IDENTITY = 7
+OP_VAR_ACCESS = 8
+OP_VAR_ASSIGN = 9
+
+BIN_OP_CODES = {
+    TOKEN_PLUS: OP_ADD,
+    TOKEN_MINUS: OP_SUBTRACT,
+    TOKEN_MULTIPLY: OP_MULTIPLY,
+    TOKEN_DIVISION: OP_DIVIDE,
+    TOKEN_POWER: OP_POWER,
+}
+BIN_OP_TOKENS = {code: t_type for t_type, code in BIN_OP_CODES.items()}
+
+# Index of a missing child
+NO_NODE = -1
+
+
+class NodeArena:
+    """
+    A compact representation of an abstract syntax tree. Instead of one
+    object per node, nodes are stored in post-order (children before their
+    parent, left before right) in parallel arrays, and refer to each other
+    by index. The root is the last node.
+
+    Since the arena is in post-order, evaluating the nodes from first to
+    last evaluates the tree in the same order as a recursive traversal.
+    """
+    # Opcode of every node
+    ops: array
+    # Index of the left child (or only child) of every node
+    lefts: array
+    # Index of the right child of every node. For variables, the slot of
+    # the identifier in the symbol table of the parser instead.
+    rights: array
+    # Index in `constants` of the number or identifier of every node
+    const_indices: array
+    # Index of the first character of every node
+    starts: array
+    # Index of the character after every node
+    ends: array
+    # Index of the operator or sign of every operation node
+    op_starts: array
+    # Numbers and identifiers used by the nodes
+    constants: list
+    # File that the tree resides in
+    file: File
+
+    @staticmethod
+    def from_node(root: Node):
+        """
+        Convert the tree of node objects rooted at `root` into an arena.
+        """
+        arena = NodeArena(root.interval.file)
+        add_node = arena.add_node
+        get_children = NodeArena.get_children
+        # Indices of the nodes added to the arena, whose parent has not
+        # been added yet
+        added = []
+        # Nodes to add. A parent is pushed below None and its children, so
+        # that it is added right after them.
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                node = stack.pop()
+                count = 2 if type(node) is BinOpNode else 1
+                child_indices = added[-count:]
+                del added[-count:]
+                added.append(add_node(node, child_indices))
+                continue
+            children = get_children(node)
+            if children:
+                stack.append(node)
+                stack.append(None)
+                stack.extend(reversed(children))
+            else:
+                added.append(add_node(node, children))
+        return arena
+
+    @staticmethod
+    def get_children(node: Node) -> list:
+        if isinstance(node, BinOpNode):
+            return [node.left, node.right]
+        if isinstance(node, UnaryOpNode):
+            return [node.child]
+        if isinstance(node, VarAssignNode):
+            return [node.value_node]
+        return []
+
+    def __init__(self, file: File) -> None:
+        self.ops = array("B")
+        self.lefts = array("l")
+        self.rights = array("l")
+        self.const_indices = array("l")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.op_starts = array("q")
+        self.constants = []
+        self.constant_lookup = {}
+        self.file = file
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    @property
+    def root(self) -> int:
+        return len(self.ops) - 1
+
+    def add_constant(self, value: any) -> int:
+        key = value_key(value)
+        idx = self.constant_lookup.get(key)
+        if idx is None:
+            idx = self.constant_lookup[key] = len(self.constants)
+            self.constants.append(value)
+        return idx
+
+    def add(self, op: int, left: int, right: int, const_idx: int, start: int, end: int, op_start: int) -> int:
+        self.ops.append(op)
+        self.lefts.append(left)
+        self.rights.append(right)
+        self.const_indices.append(const_idx)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.op_starts.append(op_start)
+        return len(self.ops) - 1
+
+    def add_node(self, node: Node, child_indices: list) -> int:
+        start = node.interval.start.idx
+        end = node.interval.end.idx
+        token = node.token
+
+        if isinstance(node, NumberNode):
+            return self.add(OP_NUMBER, NO_NODE, NO_NODE, self.add_constant(token.value), start, end, start)
+        if isinstance(node, BinOpNode):
+            return self.add(BIN_OP_CODES[token.type], child_indices[0], child_indices[1], NO_NODE,
+                            start, end, token.interval.start.idx)
+        if isinstance(node, UnaryOpNode):
+            op = OP_NEGATE if token.type == TOKEN_MINUS else OP_IDENTITY
+            return self.add(op, child_indices[0], NO_NODE, NO_NODE, start, end, token.interval.start.idx)
+        if isinstance(node, VarAccessNode):
+            return self.add(OP_VAR_ACCESS, NO_NODE, node.slot, self.add_constant(token.value), start, end, start)
+        if isinstance(node, VarAssignNode):
+            return self.add(OP_VAR_ASSIGN, child_indices[0], node.slot, self.add_constant(token.value),
+                            start, end, start)
+        raise Exception(f"No arena representation for {type(node).__name__} defined.")
+
+    def get_interval(self, idx: int) -> Interval:
+        start = OffsetPosition(self.starts[idx], self.file)
+        end = OffsetPosition(self.ends[idx], self.file)
+        return Interval(start, end, self.file)
+
+    def get_token(self, idx: int) -> Token:
+        op = self.ops[idx]
+        if op == OP_NUMBER:
+            value = self.constants[self.const_indices[idx]]
+            t_type = TOKEN_INT if isinstance(value, int) else TOKEN_FLOAT
+            return Token(t_type, value, self.get_interval(idx))
+        if op in (OP_VAR_ACCESS, OP_VAR_ASSIGN):
+            return Token(TOKEN_IDENTIFIER, self.constants[self.const_indices[idx]], self.get_interval(idx))
+
+        if op in BIN_OP_TOKENS:
+            t_type = BIN_OP_TOKENS[op]
+        else:
+            t_type = TOKEN_MINUS if op == OP_NEGATE else TOKEN_PLUS
+        interval = Interval.from_position(OffsetPosition(self.op_starts[idx], self.file), self.file)
+        return Token(t_type, None, interval)
+
+    def to_node(self) -> Node:
+        """
+        Convert the arena back into a tree of node objects, and return
+        the root.
+        """
+        nodes = []
+        for idx in range(len(self.ops)):
+            op = self.ops[idx]
+            token = self.get_token(idx)
+            if op == OP_NUMBER:
+                nodes.append(NumberNode(token))
+            elif op == OP_VAR_ACCESS:
+                nodes.append(VarAccessNode(token, self.rights[idx]))
+            elif op == OP_VAR_ASSIGN:
+                nodes.append(VarAssignNode(token, nodes[self.lefts[idx]], self.rights[idx]))
+            elif op in (OP_NEGATE, OP_IDENTITY):
+                nodes.append(UnaryOpNode(token, nodes[self.lefts[idx]]))
+            else:
+                nodes.append(BinOpNode(token, nodes[self.lefts[idx]], nodes[self.rights[idx]]))
+        return nodes[-1]
@@ -3,5 +3,9 @@ from nodes.node import Node
 
 
 class VarAccessNode(Node):
-    def __init__(self, token: Token):
+    # Slot of the identifier in the symbol table of the parser
+    slot: int
+
+    def __init__(self, token: Token, slot: int):
         super(VarAccessNode, self).__init__(token)
+        self.slot = slot
@@ -3,10 +3,14 @@ from nodes.node import Node
 
 
 class VarAssignNode(Node):
-    def __init__(self, token: Token, value_node: Node):
+    # Slot of the identifier in the symbol table of the parser
+    slot: int
+
+    def __init__(self, token: Token, value_node: Node, slot: int):
         """
         :param value_node: The node corresponding to the part of expression
             on the right side of the assignment operator.
         """
         super(VarAssignNode, self).__init__(token)
         self.value_node = value_node
+        self.slot = slot
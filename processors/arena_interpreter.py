@@ -0,0 +1,81 @@
+from typing import Tuple
+
+from errors.error import Error
+from errors.interpret_error import InterpretError
+from models.context import ExecutionContext
+from nodes.node import Node
+from nodes.node_arena import *
+from values.number import Number
+
+BIN_OPS = {
+    OP_ADD: Number.add,
+    OP_SUBTRACT: Number.subtract,
+    OP_MULTIPLY: Number.multiply,
+    OP_DIVIDE: Number.divide,
+    OP_POWER: Number.power,
+}
+
+
+class ArenaInterpreter:
+    """
+    An interpreter walking a `NodeArena` directly, producing the same
+    results and errors as `Interpreter`. Nodes are evaluated in a single
+    loop from first to last, without recursion. Intervals are only looked
+    up in the arena for the result, assigned values and errors.
+    """
+
+    def compile(self, node: Node) -> NodeArena:
+        return NodeArena.from_node(node)
+
+    def run(self, arena: NodeArena, context: ExecutionContext) -> Tuple[any, Error or None]:
+        """
+        Evaluate all nodes in `arena`, returning the value of the root
+        and the error.
+        """
+        ops = arena.ops
+        lefts = arena.lefts
+        rights = arena.rights
+        const_indices = arena.const_indices
+        constants = arena.constants
+        register = context.variable_register
+        slots = context.slots
+        values = [None] * len(ops)
+
+        for idx in range(len(ops)):
+            op = ops[idx]
+            if op == OP_NUMBER:
+                values[idx] = Number(constants[const_indices[idx]], None, context)
+            elif op in BIN_OPS:
+                result, error = BIN_OPS[op](values[lefts[idx]], values[rights[idx]])
+                if error is not None:
+                    # Operands carry no interval, the error is about the
+                    # right operand.
+                    error.interval = arena.get_interval(rights[idx])
+                    return None, error
+                values[idx] = result
+            elif op == OP_NEGATE:
+                result, error = Number(0, context=context).subtract(values[lefts[idx]])
+                if error is not None:
+                    return None, error
+                values[idx] = result
+            elif op == OP_IDENTITY:
+                values[idx] = values[lefts[idx]]
+            elif op == OP_VAR_ACCESS:
+                var_value = register.lookup(slots[rights[idx]])
+                if var_value is None:
+                    identifier = constants[const_indices[idx]]
+                    return None, InterpretError(f"Unknown identifier '{identifier}'.",
+                                                arena.get_interval(idx), context)
+                values[idx] = var_value.copy()
+            elif op == OP_VAR_ASSIGN:
+                var_value = values[lefts[idx]]
+                if var_value is not None:
+                    var_value.interval = arena.get_interval(lefts[idx])
+                register.store(slots[rights[idx]], var_value)
+            else:
+                raise Exception(f"Unknown opcode {op}.")
+
+        result = values[-1]
+        if result is not None:
+            result.interval = arena.get_interval(arena.root)
+        return result, None
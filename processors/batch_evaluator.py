@@ -0,0 +1,263 @@
+import operator
+from typing import Tuple
+
+from errors.error import Error
+from errors.interpret_error import InterpretError
+from models.batch_result import BatchResult
+from models.context import ExecutionContext
+from models.token import *
+from nodes.bin_op_node import BinOpNode
+from nodes.node import Node
+from nodes.number_node import NumberNode
+from nodes.unary_op_node import UnaryOpNode
+from nodes.var_access_node import VarAccessNode
+from nodes.var_assign_node import VarAssignNode
+from processors.optimizer import get_children
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is only needed for batch evaluation
+    np = None
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+# Integers of this magnitude or more may not be converted to floats exactly
+MAX_EXACT_FLOAT_INT = float(1 << 53)
+# Integer results estimated to reach this many bits are computed with
+# Python integers, as they may not fit in 64 bits
+MAX_INT_RESULT_BITS = 62
+
+# Same operations as the methods of `Number`, on Python numbers
+SCALAR_OPS = {
+    TOKEN_PLUS: operator.add,
+    TOKEN_MINUS: operator.sub,
+    TOKEN_MULTIPLY: operator.mul,
+    TOKEN_DIVISION: operator.truediv,
+    TOKEN_POWER: operator.pow,
+}
+
+
+class BatchEvaluator:
+    """
+    Evaluate one expression over many rows of variable values at once.
+    Every variable is bound to a one-dimensional NumPy array, and every
+    operation of the expression is done on whole arrays.
+
+    The value of every row is the same as what `Interpreter` would give
+    with the variables of that row. NumPy only does 64-bit arithmetic,
+    so rows where its result could differ from Python's (integer
+    overflow, integers too large to be converted to floats exactly, and
+    integers raised to negative powers) are recomputed with Python
+    numbers. So are powers of floats, as NumPy rounds them differently.
+    Results that do not fit in 64 bits are kept in arrays of Python
+    objects.
+
+    Division by zero does not stop the evaluation. It is reported with
+    the indices of the rows dividing by zero, and these rows are
+    masked in the result. So are the rows where Python raises an
+    arithmetic error, like raising 0.0 to a negative power.
+    """
+
+    def __init__(self):
+        if np is None:
+            raise ImportError("Batch evaluation requires numpy.")
+
+    def evaluate(self, root: Node, columns: dict, context: ExecutionContext) \
+            -> Tuple[BatchResult or None, Error or None]:
+        """
+        Evaluate the expression `root`, with variables bound to the
+        arrays in `columns`, a dictionary mapping name of variable to
+        array. Variables not in `columns` are read from the variable
+        register of `context`, and have the same value in every row.
+        """
+        columns = {name: self.to_column(values) for name, values in columns.items()}
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length.")
+        length = lengths.pop() if lengths else 1
+
+        # Rows that have not raised an error yet
+        alive = np.ones(length, dtype=bool)
+        errors = []
+        values = []
+        stack = [(root, False)]
+        while stack:
+            node, children_evaluated = stack.pop()
+            children = get_children(node)
+            if children and not children_evaluated:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+
+            if isinstance(node, NumberNode):
+                values.append(self.fill(node.token.value, length))
+            elif isinstance(node, VarAccessNode):
+                name = node.token.value
+                if name in columns:
+                    values.append(columns[name])
+                    continue
+                var_value = context.variable_register.get(name)
+                if var_value is None:
+                    return None, InterpretError(f"Unknown identifier '{name}'.", node.interval, context)
+                values.append(self.fill(var_value.value, length))
+            elif isinstance(node, VarAssignNode):
+                return None, InterpretError("Cannot assign variables in batch evaluation.", node.interval, context)
+            elif isinstance(node, (UnaryOpNode, BinOpNode)):
+                if isinstance(node, UnaryOpNode):
+                    if node.token.type != TOKEN_MINUS:
+                        continue
+                    left, right = self.fill(0, length), values.pop()
+                else:
+                    right = values.pop()
+                    left = values.pop()
+                if node.token.type == TOKEN_DIVISION:
+                    zero = alive & (right == 0)
+                    if zero.any():
+                        errors.append((
+                            InterpretError("Cannot divide by 0.", node.right.interval, context),
+                            np.flatnonzero(zero),
+                        ))
+                        alive = alive & ~zero
+
+                result, failures = self.apply(node.token.type, left, right, alive)
+                # Errors that `Number` does not catch, like overflowing a
+                # float, are reported on the operation
+                for msg, rows in failures.items():
+                    rows = np.array(rows, dtype=np.int64)
+                    errors.append((InterpretError(f"{msg[:1].upper()}{msg[1:]}.", node.interval, context), rows))
+                    alive[rows] = False
+                values.append(result)
+            else:
+                raise Exception(f"No method for {type(node).__name__} defined.")
+
+        return BatchResult(np.ma.masked_array(values.pop(), mask=~alive), errors), None
+
+    @staticmethod
+    def to_column(values: any) -> any:
+        values = np.asarray(values)
+        if values.ndim != 1:
+            raise ValueError("Columns must be one-dimensional.")
+        if values.dtype.kind == "i":
+            return values.astype(np.int64)
+        if values.dtype.kind == "u":
+            if len(values) and values.max() > INT64_MAX:
+                return values.astype(object)
+            return values.astype(np.int64)
+        if values.dtype.kind == "f":
+            return values.astype(np.float64)
+        if values.dtype.kind == "O":
+            return values
+        raise ValueError(f"Columns of type {values.dtype} are not supported.")
+
+    @staticmethod
+    def fill(value: any, length: int) -> any:
+        if isinstance(value, int) and INT64_MIN <= value <= INT64_MAX:
+            return np.full(length, value, dtype=np.int64)
+        if isinstance(value, float):
+            return np.full(length, value, dtype=np.float64)
+        values = np.empty(length, dtype=object)
+        values.fill(value)
+        return values
+
+    def apply(self, token_type: str, left: any, right: any, alive: any) -> Tuple[any, dict]:
+        """
+        Apply an operation to every alive row of `left` and `right`.
+        The values of the other rows are meaningless. Return the result,
+        and a dictionary mapping message of error to the rows where
+        Python raised that error.
+        """
+        scalar_op = SCALAR_OPS.get(token_type)
+        if scalar_op is None:
+            raise Exception(f"Unknown token type '{token_type}' not handled by parser.")
+
+        # NumPy does not compute powers of floats with the same rounding
+        # as Python does
+        integers = left.dtype.kind == "i" and right.dtype.kind == "i"
+        if left.dtype == object or right.dtype == object or token_type == TOKEN_POWER and not integers:
+            result = np.empty(len(left), dtype=object)
+            failures = self.apply_scalar(scalar_op, left, right, alive, result)
+            return self.demote(result, alive), failures
+
+        # Failed rows may hold anything, make sure they do not trip the
+        # checks below
+        if token_type in (TOKEN_DIVISION, TOKEN_POWER):
+            right = np.where(alive, right, 1 if right.dtype.kind == "i" else 1.0)
+        with np.errstate(all="ignore"):
+            result, unsafe = self.apply_vector(token_type, left, right)
+        unsafe &= alive
+        if not unsafe.any():
+            return result, {}
+
+        result = result.astype(object)
+        failures = self.apply_scalar(scalar_op, left, right, unsafe, result)
+        return self.demote(result, alive), failures
+
+    @staticmethod
+    def demote(values: any, alive: any) -> any:
+        """
+        Convert an array of Python numbers back to an array of 64-bit
+        numbers, if the values of all alive rows fit.
+        """
+        live_values = values[alive]
+        value_types = set(map(type, live_values))
+        if value_types == {float}:
+            dtype = np.float64
+        elif value_types == {int} and INT64_MIN <= min(live_values) and max(live_values) <= INT64_MAX:
+            dtype = np.int64
+        else:
+            return values
+        result = np.zeros(len(values), dtype=dtype)
+        result[alive] = live_values.astype(dtype)
+        return result
+
+    @staticmethod
+    def apply_scalar(scalar_op: any, left: any, right: any, rows: any, result: any) -> dict:
+        """
+        Apply an operation with Python numbers to some rows, writing into
+        `result`. Return a dictionary mapping message of error to the
+        rows where Python raised that error.
+        """
+        failures = {}
+        indices = np.flatnonzero(rows)
+        for idx, a, b in zip(indices, left[indices].astype(object), right[indices].astype(object)):
+            try:
+                result[idx] = scalar_op(a, b)
+            except ArithmeticError as e:
+                failures.setdefault(str(e), []).append(idx)
+        return failures
+
+    @staticmethod
+    def apply_vector(token_type: str, left: any, right: any) -> Tuple[any, any]:
+        """
+        Apply an operation with NumPy, other than a power of floats.
+        Return the result, and the rows where the result may not be the
+        same as with Python numbers.
+        """
+        integers = left.dtype.kind == "i" and right.dtype.kind == "i"
+
+        if token_type == TOKEN_PLUS:
+            result = left + right
+            unsafe = ((left ^ result) & (right ^ result)) < 0 if integers else np.zeros(len(result), dtype=bool)
+        elif token_type == TOKEN_MINUS:
+            result = left - right
+            unsafe = ((left ^ right) & (left ^ result)) < 0 if integers else np.zeros(len(result), dtype=bool)
+        elif token_type == TOKEN_MULTIPLY:
+            result = left * right
+            if integers:
+                unsafe = np.abs(left.astype(np.float64) * right) >= 2.0 ** MAX_INT_RESULT_BITS
+            else:
+                unsafe = np.zeros(len(result), dtype=bool)
+        elif token_type == TOKEN_DIVISION:
+            result = np.true_divide(left, right)
+            if integers:
+                # Python divides integers with a single rounding
+                unsafe = (np.abs(left.astype(np.float64)) >= MAX_EXACT_FLOAT_INT) | \
+                         (np.abs(right.astype(np.float64)) >= MAX_EXACT_FLOAT_INT)
+            else:
+                unsafe = np.zeros(len(result), dtype=bool)
+        else:
+            magnitude = np.log2(np.maximum(np.abs(left.astype(np.float64)), 1.0))
+            unsafe = (right < 0) | (right * magnitude >= MAX_INT_RESULT_BITS)
+            result = left ** np.where(unsafe, 0, right)
+        return result, unsafe
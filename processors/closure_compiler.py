@@ -0,0 +1,148 @@
+from typing import Tuple, Callable
+
+from errors.error import Error
+from errors.interpret_error import InterpretError, NESTED_TOO_DEEPLY
+from errors.raised_error import RaisedError
+from models.context import ExecutionContext
+from models.token import *
+from nodes.bin_op_node import BinOpNode
+from nodes.node import Node
+from nodes.number_node import NumberNode
+from nodes.unary_op_node import UnaryOpNode
+from nodes.var_access_node import VarAccessNode
+from nodes.var_assign_node import VarAssignNode
+from processors.direct_interpreter import BIN_OPS
+from values.number import Number
+
+# A compiled node, evaluated by calling it with an execution context
+Closure = Callable[[ExecutionContext], any]
+
+
+class ClosureCompiler:
+    """
+    An execution engine compiling an AST once into a tree of Python
+    closures, producing the same results and errors as `Interpreter`.
+    Node types, operators, identifiers and intervals are all looked up at
+    compile time, so evaluating the program is only a series of calls.
+    Errors are raised as a `RaisedError` carrying the `Error` object.
+    """
+
+    def __init__(self):
+        self.compilers = {
+            NumberNode: self.compile_NumberNode,
+            BinOpNode: self.compile_BinOpNode,
+            UnaryOpNode: self.compile_UnaryOpNode,
+            VarAccessNode: self.compile_VarAccessNode,
+            VarAssignNode: self.compile_VarAssignNode,
+        }
+
+    def run(self, closure: Closure, context: ExecutionContext) -> Tuple[any, Error or None]:
+        """
+        Evaluate a compiled program, returning the value and the error.
+        """
+        try:
+            return closure(context), None
+        except RaisedError as e:
+            return None, e.error
+        except RecursionError:
+            return None, InterpretError(NESTED_TOO_DEEPLY, closure.interval, context)
+
+    def compile(self, node: Node) -> Closure:
+        """
+        Compile the AST rooted at `node`. An AST nested too deeply to be
+        compiled gives a closure raising the error when evaluated. The
+        interval of the root is kept on the closure for errors.
+        """
+        try:
+            closure = self.compile_node(node)
+        except RecursionError:
+            closure = self.compile_too_deep(node)
+        closure.interval = node.interval
+        return closure
+
+    @staticmethod
+    def compile_too_deep(node: Node) -> Closure:
+        interval = node.interval
+
+        def too_deep(context: ExecutionContext) -> None:
+            raise RaisedError(InterpretError(NESTED_TOO_DEEPLY, interval, context))
+
+        return too_deep
+
+    def compile_node(self, node: Node) -> Closure:
+        compiler = self.compilers.get(type(node))
+        if compiler is None:
+            raise Exception(f"No method for {type(node).__name__} defined.")
+        return compiler(node)
+
+    def compile_NumberNode(self, node: NumberNode) -> Closure:
+        value = node.token.value
+        interval = node.token.interval
+
+        def number(context: ExecutionContext) -> Number:
+            return Number(value, interval, context)
+
+        return number
+
+    def compile_BinOpNode(self, node: BinOpNode) -> Closure:
+        left = self.compile_node(node.left)
+        right = self.compile_node(node.right)
+        interval = node.interval
+        op = BIN_OPS.get(node.token.type)
+        if op is None:
+            raise Exception(f"Unknown token type '{node.token.type}' not handled by parser.")
+
+        def bin_op(context: ExecutionContext) -> Number:
+            result, error = op(left(context), right(context))
+            if error is not None:
+                raise RaisedError(error)
+            result.interval = interval
+            return result
+
+        return bin_op
+
+    def compile_UnaryOpNode(self, node: UnaryOpNode) -> Closure:
+        child = self.compile_node(node.child)
+        interval = node.interval
+
+        if node.token.type == TOKEN_MINUS:
+            def negate(context: ExecutionContext) -> Number:
+                result, error = Number(0, context=context).subtract(child(context))
+                if error is not None:
+                    raise RaisedError(error)
+                result.interval = interval
+                return result
+
+            return negate
+
+        def identity(context: ExecutionContext) -> Number:
+            result = child(context)
+            result.interval = interval
+            return result
+
+        return identity
+
+    def compile_VarAccessNode(self, node: VarAccessNode) -> Closure:
+        identifier = node.token.value
+        slot = node.slot
+        interval = node.interval
+
+        def var_access(context: ExecutionContext) -> Number:
+            var_value = context.variable_register.lookup(context.slots[slot])
+            if var_value is None:
+                raise RaisedError(InterpretError(f"Unknown identifier '{identifier}'.", interval, context))
+            var_value = var_value.copy()
+            var_value.interval = interval
+            return var_value
+
+        return var_access
+
+    def compile_VarAssignNode(self, node: VarAssignNode) -> Closure:
+        slot = node.slot
+        value_node = self.compile_node(node.value_node)
+
+        def var_assign(context: ExecutionContext) -> None:
+            context.variable_register.store(context.slots[slot], value_node(context))
+            return None
+
+        return var_assign
@@ -0,0 +1,185 @@
+import math
+from array import array
+from typing import Tuple
+
+from errors.error import Error
+from errors.raised_error import RaisedError
+from models.context import ExecutionContext
+from models.generated_code import GeneratedCode
+from models.token import *
+from nodes.bin_op_node import BinOpNode
+from nodes.node import Node
+from nodes.number_node import NumberNode
+from nodes.unary_op_node import UnaryOpNode
+from nodes.var_access_node import VarAccessNode
+from nodes.var_assign_node import VarAssignNode
+from processors.optimizer import get_children, get_subexpression_ids, get_assignment_dependent_ids
+from values.number import Number
+
+PYTHON_OPERATORS = {
+    TOKEN_PLUS: "+",
+    TOKEN_MINUS: "-",
+    TOKEN_MULTIPLY: "*",
+    TOKEN_DIVISION: "/",
+    TOKEN_POWER: "**",
+}
+
+# Functions checking operations against the budget of the execution
+BUDGET_CHECKS = {
+    TOKEN_MULTIPLY: "_check_multiply",
+    TOKEN_POWER: "_check_power",
+}
+
+# Integers with more digits than this are not written as literals
+MAX_LITERAL_DIGITS = 100
+
+
+class PythonCodeGenerator:
+    """
+    An execution engine translating an AST into the source code of a
+    Python function, which is compiled once with `compile()` and then
+    called to run the program.
+
+    Every operation becomes one statement assigning a local variable, in
+    the same order as a recursive traversal, so nesting depth does not
+    matter. Variables of the program are loaded from the variable
+    register into local variables when the function starts, and loaded
+    again after every assignment. Operations are done on plain Python
+    numbers, like `Number` does, and division is checked for a zero
+    divisor first. An operation appearing more than once in a statement
+    is computed once, unless its value may change within the statement.
+    """
+
+    def compile(self, root: Node) -> GeneratedCode:
+        self.starts = array("q")
+        self.ends = array("q")
+        self.constants = []
+        self.variables = {}
+        self.lines = []
+        self.temp_count = 0
+        self.add_interval(root)
+
+        numbers = get_subexpression_ids(root)
+        dependent = get_assignment_dependent_ids(root)
+        # Dictionary mapping the number of a subexpression to the local
+        # variable holding its value
+        computed = {}
+        # Python expressions of the values of the nodes whose parent has
+        # not been translated yet
+        operands = []
+        stack = [(root, False)]
+        while stack:
+            node, children_translated = stack.pop()
+            number = numbers[id(node)]
+            if number in computed:
+                operands.append(computed[number])
+                continue
+
+            children = get_children(node)
+            if children and not children_translated:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+
+            child_operands = operands[len(operands) - len(children):]
+            del operands[len(operands) - len(children):]
+            operand = self.translate(node, child_operands)
+            is_operation = isinstance(node, BinOpNode) or isinstance(node, UnaryOpNode) and node.token.type == TOKEN_MINUS
+            if is_operation and id(node) not in dependent:
+                computed[number] = operand
+            operands.append(operand)
+
+        prologue = ["    budget = context.budget"]
+        prologue += [f"    v{idx} = _load(register, slots[{idx}])" for idx in self.variables.values()]
+        prologue += [f"    c{idx} = _constants[{idx}]" for idx in range(len(self.constants))]
+        source = "\n".join(["def program(register, slots, context):"] + prologue + self.lines +
+                           [f"    return {operands[0]}", ""])
+        code = compile(source, f"<jimmy-script {root.interval.file.name}>", "exec")
+        return GeneratedCode(source, code, tuple(self.constants), tuple(self.variables), self.starts, self.ends,
+                             root.interval.file)
+
+    def run(self, generated: GeneratedCode, context: ExecutionContext) -> Tuple[any, Error or None]:
+        """
+        Call the generated function, returning the value and the error.
+        """
+        try:
+            register = context.variable_register
+            value = generated.function(register, generated.get_slots(register.symbol_table), context)
+        except RaisedError as e:
+            return None, e.error
+
+        if value is not None:
+            value = Number(value, generated.get_interval(0), context)
+        return value, None
+
+    def add_interval(self, node: Node) -> int:
+        self.starts.append(node.interval.start.idx)
+        self.ends.append(node.interval.end.idx)
+        return len(self.starts) - 1
+
+    def add_variable(self, name: str) -> int:
+        idx = self.variables.get(name)
+        if idx is None:
+            idx = self.variables[name] = len(self.variables)
+        return idx
+
+    def new_temp(self) -> str:
+        self.temp_count += 1
+        return f"t{self.temp_count}"
+
+    def emit(self, line: str) -> None:
+        self.lines.append("    " + line)
+
+    def translate(self, node: Node, operands: list) -> str:
+        """
+        Emit the statements computing the value of `node`, given the
+        Python expressions of the values of its children. Return the
+        Python expression of the value of `node`.
+        """
+        if isinstance(node, NumberNode):
+            return self.translate_number(node.token.value)
+
+        if isinstance(node, VarAccessNode):
+            name = node.token.value
+            local = f"v{self.add_variable(name)}"
+            self.emit(f"if {local} is _MISSING: _unknown_identifier({self.add_interval(node)}, {name!r}, context)")
+            return local
+
+        if isinstance(node, VarAssignNode):
+            idx = self.add_variable(node.token.value)
+            interval_idx = self.add_interval(node.value_node)
+            self.emit(f"_store(register, slots[{idx}], {operands[0]}, {interval_idx}, context)")
+            # Later reads in the statement see the new value
+            self.emit(f"v{idx} = _load(register, slots[{idx}])")
+            return "None"
+
+        if isinstance(node, UnaryOpNode):
+            if node.token.type != TOKEN_MINUS:
+                return operands[0]
+            temp = self.new_temp()
+            self.emit(f"{temp} = 0 - {operands[0]}")
+            return temp
+
+        if isinstance(node, BinOpNode):
+            operator = PYTHON_OPERATORS.get(node.token.type)
+            if operator is None:
+                raise Exception(f"Unknown token type '{node.token.type}' not handled by parser.")
+            left, right = operands
+            if node.token.type == TOKEN_DIVISION:
+                self.emit(f"if {right} == 0: _divide_by_zero({self.add_interval(node.right)}, context)")
+            elif node.token.type in BUDGET_CHECKS:
+                check = BUDGET_CHECKS[node.token.type]
+                self.emit(f"if budget is not None: {check}(budget, {left}, {right}, "
+                          f"{self.add_interval(node.right)}, context)")
+            temp = self.new_temp()
+            self.emit(f"{temp} = {left} {operator} {right}")
+            return temp
+
+        raise Exception(f"No method for {type(node).__name__} defined.")
+
+    def translate_number(self, value: any) -> str:
+        if isinstance(value, int) and abs(value) < 10 ** MAX_LITERAL_DIGITS or \
+                isinstance(value, float) and math.isfinite(value):
+            return f"({value!r})"
+        self.constants.append(value)
+        return f"c{len(self.constants) - 1}"
@@ -0,0 +1,161 @@
+from typing import Generator
+
+from models.bytecode import *
+from models.token import *
+from nodes.bin_op_node import BinOpNode
+from nodes.node import Node
+from nodes.number_node import NumberNode
+from nodes.unary_op_node import UnaryOpNode
+from nodes.var_access_node import VarAccessNode
+from nodes.var_assign_node import VarAssignNode
+from processors.optimizer import get_subexpression_ids, get_children, get_assignment_dependent_ids
+from utils import run_to_end
+from values.number import value_key
+
+BIN_OP_OPCODES = {
+    TOKEN_PLUS: ADD,
+    TOKEN_MINUS: SUBTRACT,
+    TOKEN_MULTIPLY: MULTIPLY,
+    TOKEN_DIVISION: DIVIDE,
+    TOKEN_POWER: POWER,
+}
+
+
+class Compiler:
+    """
+    A compiler lowering an AST to `Bytecode` for the virtual machine.
+    Nodes are compiled in post-order without recursion, so that the
+    instructions run in the same order as a recursive traversal.
+
+    With `eliminate_common_subexpressions`, an operation appearing more
+    than once in a statement is computed once, kept in a temporary slot,
+    and loaded from there afterwards. Every load keeps its own interval,
+    so errors are the same.
+    """
+    # Bytecode being generated
+    bytecode: Bytecode
+    # Whether to compute identical operations only once
+    eliminate_common_subexpressions: bool
+
+    def __init__(self, eliminate_common_subexpressions: bool = True):
+        self.eliminate_common_subexpressions = eliminate_common_subexpressions
+
+    def compile(self, root: Node) -> Bytecode:
+        return run_to_end(self.compile_sliced(root))
+
+    def compile_sliced(self, root: Node, slice_size: int = None) -> Generator[None, None, Bytecode]:
+        """
+        Compile an AST like `compile`. If `slice_size` is given, None is
+        generated after finding common subexpressions, and whenever
+        `slice_size` nodes have been compiled since the last time.
+        """
+        self.bytecode = Bytecode(root.interval.file)
+        self.constant_lookup = {}
+        self.name_lookup = {}
+        self.find_common_subexpressions(root)
+        if slice_size is not None:
+            yield
+
+        # Number of nodes compiled since the last pause
+        compiled = 0
+        stack = [(root, False)]
+        while stack:
+            if slice_size is not None:
+                compiled += 1
+                if compiled >= slice_size:
+                    compiled = 0
+                    yield
+            node, children_compiled = stack.pop()
+            if children_compiled:
+                self.emit_node(node)
+                self.store_common_subexpression(node)
+                continue
+
+            temp = self.temps.get(self.subexpression_ids.get(id(node)))
+            if temp is not None:
+                self.emit(LOAD_TEMP, temp, node)
+            elif isinstance(node, BinOpNode):
+                stack.extend(((node, True), (node.right, False), (node.left, False)))
+            elif isinstance(node, UnaryOpNode):
+                stack.extend(((node, True), (node.child, False)))
+            elif isinstance(node, VarAssignNode):
+                stack.extend(((node, True), (node.value_node, False)))
+            else:
+                self.emit_node(node)
+
+        self.emit(RETURN, 0, root)
+        return self.bytecode
+
+    def find_common_subexpressions(self, root: Node) -> None:
+        # Dictionary mapping the id() of every operation node appearing
+        # more than once to the number of its subexpression
+        self.subexpression_ids = {}
+        # Dictionary mapping the number of a subexpression to its
+        # temporary slot, once it is computed
+        self.temps = {}
+        if not self.eliminate_common_subexpressions:
+            return
+
+        # Operations whose value may change within the statement, because
+        # they contain an assignment or read an assigned variable, are
+        # never shared. The operations inside a repeated operation are
+        # only counted once.
+        numbers = get_subexpression_ids(root)
+        dependent = get_assignment_dependent_ids(root)
+        counts = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            is_operation = isinstance(node, BinOpNode) or isinstance(node, UnaryOpNode) and node.token.type == TOKEN_MINUS
+            if is_operation and id(node) not in dependent:
+                number = numbers[id(node)]
+                counts[number] = counts.get(number, 0) + 1
+                if counts[number] > 1:
+                    continue
+            stack.extend(get_children(node))
+
+        self.subexpression_ids = {node_id: number for node_id, number in numbers.items()
+                                  if counts.get(number, 0) > 1 and node_id not in dependent}
+
+    def store_common_subexpression(self, node: Node) -> None:
+        number = self.subexpression_ids.get(id(node))
+        if number is not None and number not in self.temps:
+            temp = self.temps[number] = self.bytecode.temp_count
+            self.bytecode.temp_count += 1
+            self.emit(STORE_TEMP, temp, node)
+
+    def emit(self, opcode: int, arg: int, node: Node) -> None:
+        self.bytecode.emit(opcode, arg, node.interval.start.idx, node.interval.end.idx)
+
+    def emit_node(self, node: Node) -> None:
+        if isinstance(node, NumberNode):
+            self.emit(LOAD_CONST, self.add_constant(node.token.value), node)
+        elif isinstance(node, VarAccessNode):
+            self.emit(LOAD_NAME, self.add_name(node.token.value), node)
+        elif isinstance(node, VarAssignNode):
+            self.emit(STORE_NAME, self.add_name(node.token.value), node.value_node)
+        elif isinstance(node, BinOpNode):
+            opcode = BIN_OP_OPCODES.get(node.token.type)
+            if opcode is None:
+                raise Exception(f"Unknown token type '{node.token.type}' not handled by parser.")
+            self.emit(opcode, 0, node.right)
+        elif isinstance(node, UnaryOpNode):
+            if node.token.type == TOKEN_MINUS:
+                self.emit(NEGATE, 0, node)
+        else:
+            raise Exception(f"No method for {type(node).__name__} defined.")
+
+    def add_constant(self, value: any) -> int:
+        key = value_key(value)
+        idx = self.constant_lookup.get(key)
+        if idx is None:
+            idx = self.constant_lookup[key] = len(self.bytecode.constants)
+            self.bytecode.constants.append(value)
+        return idx
+
+    def add_name(self, name: str) -> int:
+        idx = self.name_lookup.get(name)
+        if idx is None:
+            idx = self.name_lookup[name] = len(self.bytecode.names)
+            self.bytecode.names.append(name)
+        return idx
@@ -0,0 +1,108 @@
+from typing import Tuple
+
+from errors.error import Error
+from errors.interpret_error import InterpretError, NESTED_TOO_DEEPLY
+from errors.raised_error import RaisedError
+from models.context import ExecutionContext
+from models.token import *
+from nodes.bin_op_node import BinOpNode
+from nodes.node import Node
+from nodes.number_node import NumberNode
+from nodes.unary_op_node import UnaryOpNode
+from nodes.var_access_node import VarAccessNode
+from nodes.var_assign_node import VarAssignNode
+from values.number import Number
+
+BIN_OPS = {
+    TOKEN_PLUS: Number.add,
+    TOKEN_MINUS: Number.subtract,
+    TOKEN_MULTIPLY: Number.multiply,
+    TOKEN_DIVISION: Number.divide,
+    TOKEN_POWER: Number.power,
+}
+
+
+class DirectInterpreter:
+    """
+    An interpreter producing the same results and errors as `Interpreter`,
+    without wrapping every result in an `InterpreterPromise`. Visiting a
+    node returns a bare value, and errors are raised as a `RaisedError`
+    carrying the `Error` object.
+    """
+
+    def __init__(self):
+        self.visitors = {
+            NumberNode: self.visit_NumberNode,
+            BinOpNode: self.visit_BinOpNode,
+            UnaryOpNode: self.visit_UnaryOpNode,
+            VarAccessNode: self.visit_VarAccessNode,
+            VarAssignNode: self.visit_VarAssignNode,
+        }
+
+    def compile(self, node: Node) -> Node:
+        """
+        Prepare AST rooted at `node` for `run`. Nothing to do, the
+        interpreter visits the AST directly.
+        """
+        return node
+
+    def run(self, node: Node, context: ExecutionContext) -> Tuple[any, Error or None]:
+        """
+        Evaluate AST rooted at `node`, returning the value and the error.
+        """
+        try:
+            return self.visit(node, context), None
+        except RaisedError as e:
+            return None, e.error
+        except RecursionError:
+            return None, InterpretError(NESTED_TOO_DEEPLY, node.interval, context)
+
+    def visit(self, node: Node, context: ExecutionContext) -> any:
+        visitor = self.visitors.get(type(node))
+        if visitor is None:
+            raise Exception(f"No method for {type(node).__name__} defined.")
+        return visitor(node, context)
+
+    def visit_NumberNode(self, node: NumberNode, context: ExecutionContext) -> Number:
+        token = node.token
+        return Number(token.value, token.interval, context)
+
+    def visit_BinOpNode(self, node: BinOpNode, context: ExecutionContext) -> Number:
+        left = self.visit(node.left, context)
+        right = self.visit(node.right, context)
+
+        op = BIN_OPS.get(node.token.type)
+        if op is None:
+            raise Exception(f"Unknown token type '{node.token.type}' not handled by parser.")
+        result, error = op(left, right)
+        if error is not None:
+            raise RaisedError(error)
+
+        result.interval = node.interval
+        return result
+
+    def visit_UnaryOpNode(self, node: UnaryOpNode, context: ExecutionContext) -> Number:
+        result = self.visit(node.child, context)
+
+        if node.token.type == TOKEN_MINUS:
+            result, error = Number(0, context=context).subtract(result)
+            if error is not None:
+                raise RaisedError(error)
+
+        result.interval = node.interval
+        return result
+
+    def visit_VarAccessNode(self, node: VarAccessNode, context: ExecutionContext) -> Number:
+        identifier = node.token.value
+        var_value = context.variable_register.lookup(context.slots[node.slot])
+        if var_value is None:
+            raise RaisedError(InterpretError(f"Unknown identifier '{identifier}'.", node.interval, context))
+
+        var_value = var_value.copy()
+        var_value.interval = node.interval
+        return var_value
+
+    def visit_VarAssignNode(self, node: VarAssignNode, context: ExecutionContext) -> None:
+        var_value = self.visit(node.value_node, context)
+        context.variable_register.store(context.slots[node.slot], var_value)
+        return None
@@ -0,0 +1,241 @@
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List, Iterator, Tuple, Optional
+
+from errors.error import Error
+from models.position import File, FileChunk, NEW_LINE
+from models.token_stream import TokenStream
+from nodes.node import Node
+from processors.laxer import FastLexer
+from processors.iterative_parser import IterativeParser
+
+# Number of lines in a block of an `IncrementalParser` by default
+DEFAULT_BLOCK_SIZE = 512
+
+
+class LineChunk(FileChunk):
+    """
+    A file chunk holding one line of an `IncrementalParser`. Lines before
+    it can be added or removed by edits, so its row is looked up in the
+    parser when it is needed, which is usually only when an error is
+    reported.
+    """
+    # Parser holding the line
+    parser: any
+    # Line made of this chunk
+    line: any
+    # Block holding the line
+    block: any
+
+    def __init__(self, name: str, content: str, parser: any) -> None:
+        File.__init__(self, name, content)
+        self.parser = parser
+        self.line = None
+        self.block = None
+
+    @property
+    def first_row(self) -> int:
+        return self.parser.get_line_row(self.line)
+
+
+class Line:
+    """
+    A line of code in an incrementally parsed file, with its tokens and
+    abstract syntax tree. Positions in a line are relative to the start
+    of the line, so a line that is not edited keeps its tokens and tree
+    as-is, no matter what happens to the lines before it.
+    """
+    # File chunk holding the content of this line, without the newline
+    file: LineChunk
+    # Tokens in this line, None if the line could not be lexed
+    tokens: TokenStream or None
+    # Abstract syntax tree of the expression in this line, None if the
+    # line is blank or has an error
+    node: Node or None
+    # Error raised when lexing or parsing this line
+    error: Error or None
+
+    def __init__(self, file: LineChunk) -> None:
+        self.file = file
+        self.node = None
+        self.error = None
+        file.line = self
+
+        lexer = FastLexer(file.content, file)
+        self.tokens, self.error = lexer.get_token_stream()
+        if self.error or len(self.tokens) == 1:
+            return
+
+        ast = IterativeParser(self.tokens).parse()
+        self.node, self.error = ast.node, ast.error
+
+    @property
+    def content(self) -> str:
+        return self.file.content
+
+
+class LineBlock:
+    """ A run of consecutive lines of an `IncrementalParser`. """
+    # Lines in this block
+    lines: List[Line]
+    # Number of characters in the lines of this block, counting a
+    # newline after every line
+    length: int
+
+    def __init__(self, lines: List[Line]) -> None:
+        self.lines = lines
+        self.length = 0
+        for line in lines:
+            line.file.block = self
+            self.length += len(line.content) + 1
+
+
+class IncrementalParser:
+    """
+    Keep the tokens and abstract syntax tree of a file up to date while
+    it is being edited. Newlines separate top-level expressions, and no
+    token or expression spans more than one line, so an edit only
+    re-lexes and re-parses the lines it touches. The other lines are
+    reused unchanged.
+
+    Reuse stops at the line: a line touched by an edit is lexed and
+    parsed again as a whole, and none of its old tokens or subtrees are
+    reused, so an edit costs time proportional to the length of the
+    lines it touches.
+
+    Lines are kept in blocks of about `block_size` lines. Lines do not
+    store their index or row, and the index of the first character and
+    the row of every block are only rebuilt when needed, so an edit takes
+    time proportional to the number of blocks and the size of a block,
+    not to the number of lines.
+
+    The result is always the same as parsing the edited file from
+    scratch with a new `IncrementalParser`.
+    """
+    # Name of the file
+    name: str
+    # Blocks of lines in the file, in order
+    blocks: List[LineBlock]
+    # Number of lines in a block, blocks are split when they grow to
+    # twice as many
+    block_size: int
+    # Number of characters in the file
+    length: int
+    # Index of the first character of every block, None until needed
+    _block_starts: Optional[List[int]]
+    # Row of the first line of every block, None until needed
+    _block_rows: Optional[List[int]]
+
+    def __init__(self, name: str, raw: str, block_size: int = DEFAULT_BLOCK_SIZE) -> None:
+        self.name = name
+        self.block_size = block_size
+        self.length = len(raw)
+        self.blocks = self.make_blocks([self.make_line(content) for content in raw.split(NEW_LINE)])
+        self._block_starts = None
+        self._block_rows = None
+
+    @property
+    def lines(self) -> List[Line]:
+        return [line for block in self.blocks for line in block.lines]
+
+    @property
+    def text(self) -> str:
+        return NEW_LINE.join(line.content for block in self.blocks for line in block.lines)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def make_line(self, content: str) -> Line:
+        return Line(LineChunk(self.name, content, self))
+
+    def make_blocks(self, lines: List[Line]) -> List[LineBlock]:
+        size = self.block_size
+        return [LineBlock(lines[start:start + size]) for start in range(0, len(lines), size)]
+
+    @property
+    def block_starts(self) -> List[int]:
+        if self._block_starts is None:
+            self._block_starts = [0] + list(accumulate(block.length for block in self.blocks))[:-1]
+        return self._block_starts
+
+    @property
+    def block_rows(self) -> List[int]:
+        if self._block_rows is None:
+            self._block_rows = [0] + list(accumulate(len(block.lines) for block in self.blocks))[:-1]
+        return self._block_rows
+
+    def get_line_row(self, line: Line) -> int:
+        block = line.file.block
+        return self.block_rows[self.blocks.index(block)] + block.lines.index(line)
+
+    def locate(self, idx: int) -> Tuple[int, int, int]:
+        """
+        Return the index of the block holding the line of the character
+        at index `idx`, the index of the line in the block, and the index
+        of the first character of the line.
+        """
+        block_idx = bisect_right(self.block_starts, idx) - 1
+        start = self.block_starts[block_idx]
+        lines = self.blocks[block_idx].lines
+        for line_idx, line in enumerate(lines):
+            end = start + len(line.content) + 1
+            if idx < end:
+                return block_idx, line_idx, start
+            start = end
+        # The end of the file
+        return block_idx, len(lines) - 1, start - len(lines[-1].content) - 1
+
+    def get_row(self, idx: int) -> int:
+        block_idx, line_idx, _ = self.locate(idx)
+        return self.block_rows[block_idx] + line_idx
+
+    def edit(self, offset: int, deleted_length: int, inserted: str) -> None:
+        """
+        Replace `deleted_length` characters starting at index `offset`
+        with the text `inserted`.
+        """
+        if offset < 0 or deleted_length < 0 or offset + deleted_length > len(self):
+            raise ValueError(f"Edit at {offset} deleting {deleted_length} characters is out of range.")
+
+        # Rebuild the lines touched by the edit
+        first_block, first_line, first_start = self.locate(offset)
+        last_block, last_line, _ = self.locate(offset + deleted_length)
+        blocks = self.blocks[first_block:last_block + 1]
+        if first_block == last_block:
+            old_lines = blocks[0].lines[first_line:last_line + 1]
+        else:
+            old_lines = blocks[0].lines[first_line:] + \
+                [line for block in blocks[1:-1] for line in block.lines] + blocks[-1].lines[:last_line + 1]
+        old_text = NEW_LINE.join(line.content for line in old_lines)
+        edit_start = offset - first_start
+        new_text = old_text[:edit_start] + inserted + old_text[edit_start + deleted_length:]
+        new_lines = [self.make_line(content) for content in new_text.split(NEW_LINE)]
+
+        lines = blocks[0].lines[:first_line] + new_lines + blocks[-1].lines[last_line + 1:]
+        shift = len(new_text) - len(old_text)
+        rebuilt = first_block != last_block or len(lines) >= 2 * self.block_size
+        if rebuilt:
+            self.blocks[first_block:last_block + 1] = self.make_blocks(lines)
+        else:
+            # Update the block in place, keeping the other blocks as-is
+            block = blocks[0]
+            block.lines = lines
+            block.length += shift
+            for line in new_lines:
+                line.file.block = block
+
+        self.length += shift
+        if rebuilt or shift != 0:
+            self._block_starts = None
+        if rebuilt or len(new_lines) != len(old_lines):
+            self._block_rows = None
+
+    def get_statements(self) -> Iterator[Tuple[Node or None, Error or None]]:
+        """
+        Generate the abstract syntax tree or the error of every line
+        that is not blank.
+        """
+        for block in self.blocks:
+            for line in block.lines:
+                if line.node is not None or line.error is not None:
+                    yield line.node, line.error
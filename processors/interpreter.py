@@ -1,4 +1,8 @@
-from errors.interpret_error import InterpretError
+from typing import Tuple
+
+from errors.error import Error
+from errors.interpret_error import InterpretError, NESTED_TOO_DEEPLY
+from errors.raised_error import RaisedError
 from models.context import ExecutionContext
 from models.token import *
 from nodes.bin_op_node import BinOpNode
@@ -12,6 +16,88 @@ from values.number import Number
 
 
 class Interpreter:
+    def compile(self, node: Node) -> Node:
+        """
+        Prepare AST rooted at `node` for `run`. Nothing to do, the
+        interpreter traverses the AST directly.
+        """
+        return node
+
+    def run(self, node: Node, context: ExecutionContext) -> Tuple[any, Error or None]:
+        """
+        Evaluate AST rooted at `node`, returning the value and the error.
+        """
+        try:
+            value = self.evaluate(node, context)
+        except RaisedError as e:
+            return None, e.error
+        except RecursionError:
+            return None, InterpretError(NESTED_TOO_DEEPLY, node.interval, context)
+
+        if value is None:
+            return None, None
+        return Number(value, node.interval, context), None
+
+    def evaluate(self, node: Node, context: ExecutionContext) -> int or float or None:
+        """
+        Evaluate AST rooted at `node` on plain Python numbers, giving the
+        same value as `traverse` without allocating a `Number` for every
+        step. Values are only wrapped in a `Number` when assigned to a
+        variable. Errors are raised as a `RaisedError`.
+        """
+        node_type = type(node)
+        if node_type is NumberNode:
+            return node.token.value
+
+        if node_type is BinOpNode:
+            left = self.evaluate(node.left, context)
+            right = self.evaluate(node.right, context)
+            op_type = node.token.type
+            if op_type == TOKEN_PLUS:
+                return left + right
+            if op_type == TOKEN_MINUS:
+                return left - right
+            if op_type == TOKEN_MULTIPLY:
+                budget = context.budget
+                if budget is not None:
+                    error = budget.check_multiply(left, right, node.right.interval, context)
+                    if error is not None:
+                        raise RaisedError(error)
+                return left * right
+            if op_type == TOKEN_DIVISION:
+                # Same check as `Number.divide`, reported on the right operand
+                if right == 0:
+                    raise RaisedError(InterpretError("Cannot divide by 0.", node.right.interval, context))
+                return left / right
+            if op_type == TOKEN_POWER:
+                budget = context.budget
+                if budget is not None:
+                    error = budget.check_power(left, right, node.right.interval, context)
+                    if error is not None:
+                        raise RaisedError(error)
+                return left ** right
+            raise Exception(f"Unknown token type '{op_type}' not handled by parser.")
+
+        if node_type is UnaryOpNode:
+            value = self.evaluate(node.child, context)
+            return 0 - value if node.token.type == TOKEN_MINUS else value
+
+        if node_type is VarAccessNode:
+            var_value = context.variable_register.lookup(context.slots[node.slot])
+            if var_value is None:
+                identifier = node.token.value
+                raise RaisedError(InterpretError(f"Unknown identifier '{identifier}'.", node.interval, context))
+            return var_value.value
+
+        if node_type is VarAssignNode:
+            value = self.evaluate(node.value_node, context)
+            if value is not None:
+                value = Number(value, node.value_node.interval, context)
+            context.variable_register.store(context.slots[node.slot], value)
+            return None
+
+        return self.traverse_fallback(node)
+
     def traverse(self, node: Node, context: ExecutionContext) -> InterpreterPromise:
         """
         Traverse AST rooted at `node`.
@@ -62,7 +148,7 @@ class Interpreter:
             return promise
 
         if node.token.type == TOKEN_MINUS:
-            result, error = Number(0).subtract(result)
+            result, error = Number(0, context=context).subtract(result)
             if error is not None:
                 return promise.reject(error)
 
@@ -72,7 +158,7 @@ class Interpreter:
     def traverse_VarAccessNode(self, node: VarAccessNode, context: ExecutionContext):
         promise = InterpreterPromise()
         identifier = node.token.value
-        var_value = context.variable_register.get(identifier)
+        var_value = context.variable_register.lookup(context.slots[node.slot])
         if var_value is None:
             return promise.reject(InterpretError(f"Unknown identifier '{identifier}'.", node.interval, context))
 
@@ -82,12 +168,11 @@ class Interpreter:
 
     def traverse_VarAssignNode(self, node: VarAssignNode, context: ExecutionContext):
         promise = InterpreterPromise()
-        identifier = node.token.value
         var_value = promise.register(self.traverse(node.value_node, context))
         if promise.error:
             return promise
 
-        context.variable_register.set(identifier, var_value)
+        context.variable_register.store(context.slots[node.slot], var_value)
         return promise.resolve(None)
 
     def traverse_fallback(self, node) -> None:
@@ -0,0 +1,155 @@
+from typing import Generator
+
+from errors.bad_syntax_error import BadSyntaxError
+from models.token import *
+from nodes.bin_op_node import BinOpNode
+from nodes.number_node import NumberNode
+from nodes.unary_op_node import UnaryOpNode
+from nodes.var_access_node import VarAccessNode
+from nodes.var_assign_node import VarAssignNode
+from processors.parser import Parser
+from processors.promises import ParserPromise
+from utils import run_to_end
+
+# Precedence of binary operators, binding tighter with larger numbers
+BIN_OP_PRECEDENCE = {
+    TOKEN_PLUS: 1,
+    TOKEN_MINUS: 1,
+    TOKEN_MULTIPLY: 2,
+    TOKEN_DIVISION: 2,
+    TOKEN_POWER: 3,
+}
+# A sign binds tighter than multiplication and division, but the power
+# operator binds tighter than a sign, i.e. -2^2 is -(2^2).
+UNARY_OP_PRECEDENCE = 2
+RIGHT_ASSOCIATIVE_OPS = (TOKEN_POWER,)
+
+# Kinds of entries in the operator stack
+STACK_BIN_OP = 0
+STACK_UNARY_OP = 1
+STACK_ASSIGNMENT = 2
+STACK_BRACKET = 3
+
+
+class IterativeParser(Parser):
+    """
+    A parser building the same abstract syntax tree as `Parser`, with the
+    same errors, using precedence climbing over an explicit operator stack
+    instead of recursion. Nesting depth is not limited by the Python
+    recursion limit, and parse time is linear in the number of tokens.
+    """
+
+    def expr(self):
+        """
+        Return a node representation of an expression.
+        """
+        return run_to_end(self.expr_sliced())
+
+    def expr_sliced(self, slice_size: int = None) -> Generator[None, None, ParserPromise]:
+        """
+        Parse an expression like `expr`. If `slice_size` is given, None is
+        generated whenever `slice_size` tokens have been read since the
+        last time.
+        """
+        # Every entry in the stack is a tuple starting with its kind:
+        # (STACK_BIN_OP, operator token, left node, precedence),
+        # (STACK_UNARY_OP, sign token),
+        # (STACK_ASSIGNMENT, identifier token, slot of the identifier),
+        # (STACK_BRACKET,).
+        stack = []
+        # Whether an expression may start at the current token, i.e. the
+        # `let` keyword is allowed.
+        expr_start = True
+        # Index of the first token read since the last pause
+        slice_start = self.curr_idx
+
+        while True:
+            if slice_size is not None and self.curr_idx - slice_start >= slice_size:
+                slice_start = self.curr_idx
+                yield
+            # Read prefixes up to and including the next atom
+            token_type = self.curr_type
+            if token_type in NUMBER_TOKENS:
+                node = NumberNode(self.curr_token())
+                self.next()
+            elif token_type == TOKEN_IDENTIFIER:
+                token = self.curr_token()
+                node = VarAccessNode(token, self.symbol_table.intern(token.value))
+                self.next()
+            elif token_type in (TOKEN_PLUS, TOKEN_MINUS):
+                stack.append((STACK_UNARY_OP, self.curr_token()))
+                self.next()
+                expr_start = False
+                continue
+            elif token_type == TOKEN_LBRACKET:
+                stack.append((STACK_BRACKET,))
+                self.next()
+                expr_start = True
+                continue
+            elif expr_start and token_type == TOKEN_KEYWORD and self.tokens.values[self.curr_idx] == "let":
+                self.next()
+                if self.curr_type != TOKEN_IDENTIFIER:
+                    return ParserPromise().reject(
+                        BadSyntaxError("Identifier expected after let keyword.", self.curr_interval()))
+
+                identifier = self.curr_token()
+                self.next()
+                if self.curr_type != TOKEN_ASSIGNMENT and \
+                        self.curr_type != TOKEN_KEYWORD:
+                    return ParserPromise().reject(BadSyntaxError(f"Invalid assignment operator {self.curr_token()}.",
+                                                                 self.curr_interval()))
+
+                self.next()
+                stack.append((STACK_ASSIGNMENT, identifier, self.symbol_table.intern(identifier.value)))
+                continue
+            else:
+                return ParserPromise().reject(
+                    BadSyntaxError(f"Expecting a number, sign, or bracket.", self.curr_interval()))
+
+            # Read operators and closing brackets following the atom
+            while True:
+                token_type = self.curr_type
+                precedence = BIN_OP_PRECEDENCE.get(token_type)
+                if precedence is not None:
+                    right_associative = token_type in RIGHT_ASSOCIATIVE_OPS
+                    node = self.reduce(stack, node, precedence, right_associative)
+                    stack.append((STACK_BIN_OP, self.curr_token(), node, precedence))
+                    self.next()
+                    expr_start = False
+                    break
+
+                # End of an expression, reduce everything until the innermost
+                # open bracket.
+                node = self.reduce(stack, node, 0, False)
+                if not stack:
+                    return ParserPromise().resolve(node)
+                if token_type != TOKEN_RBRACKET:
+                    return ParserPromise().reject(BadSyntaxError("Missing ')'.", self.curr_interval()))
+                stack.pop()
+                self.next()
+
+    @staticmethod
+    def reduce(stack: list, node, precedence: int, right_associative: bool):
+        """
+        Merge `node` with the operators on top of the stack binding tighter
+        than an operator of `precedence`. Return the merged node.
+        """
+        while stack:
+            entry = stack[-1]
+            kind = entry[0]
+            if kind == STACK_BIN_OP:
+                if entry[3] < precedence or (entry[3] == precedence and right_associative):
+                    break
+                node = BinOpNode(entry[1], entry[2], node)
+            elif kind == STACK_UNARY_OP:
+                if UNARY_OP_PRECEDENCE < precedence:
+                    break
+                node = UnaryOpNode(entry[1], node)
+            elif kind == STACK_ASSIGNMENT:
+                if precedence > 0:
+                    break
+                node = VarAssignNode(entry[1], node, entry[2])
+            else:
+                break
+            stack.pop()
+        return node
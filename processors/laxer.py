@@ -1,9 +1,11 @@
-from typing import Tuple, List
+import re
+from typing import Generator, Tuple, List
 
 from errors.error import Error
 from errors.unexpected_token_error import UnexpectedTokenError
 from models.position import *
 from models.token import *
+from models.token_stream import TokenStream
 
 
 class Lexer:
@@ -44,7 +46,7 @@ class Lexer:
         tokens = []
 
         while self.curr is not None:
-            token_interval = Interval.from_position(self.pos, self.file)
+            token_interval = Interval.from_position(self.pos.copy(), self.file)
 
             if self.curr in SPACES:
                 # Ignore, go to the next token
@@ -137,3 +139,169 @@ class Lexer:
             return Token(TOKEN_INT, int(parsed_str), interval)
         else:
             return Token(TOKEN_FLOAT, float(parsed_str), interval)
+
+
+################################
+# TABLE-DRIVEN LAXER
+################################
+_SPACES_PATTERN = re.compile(f"[{re.escape(SPACES)}]+")
+_ASSIGNMENT_PATTERN = re.compile(f"[{re.escape(ASSIGNMENT_OP_CHAR)}]+")
+_NUMBER_PATTERN = re.compile(f"[{DIGITS}]+(?:\\.[{DIGITS}]*)?")
+_IDENTIFIER_PATTERN = re.compile(f"[{re.escape(IDENTIFIER_CHAR)}]+")
+
+# Character classes, looked up by the first character of a token
+CHAR_SPACE = 0
+CHAR_DIGIT = 1
+CHAR_LETTER = 2
+CHAR_OP = 3
+CHAR_NEWLINE = 4
+
+CHAR_CLASSES = {
+    NEW_LINE: CHAR_NEWLINE,
+    **{char: CHAR_SPACE for char in SPACES},
+    **{char: CHAR_DIGIT for char in DIGITS},
+    **{char: CHAR_LETTER for char in LETTERS},
+    **{char: CHAR_OP for char in TOKEN_MAP},
+}
+
+OP_CODES = {char: TOKEN_CODES[t_type] for char, t_type in TOKEN_MAP.items()}
+CODE_INT = TOKEN_CODES[TOKEN_INT]
+CODE_FLOAT = TOKEN_CODES[TOKEN_FLOAT]
+CODE_IDENTIFIER = TOKEN_CODES[TOKEN_IDENTIFIER]
+CODE_KEYWORD = TOKEN_CODES[TOKEN_KEYWORD]
+CODE_ASSIGNMENT = TOKEN_CODES[TOKEN_ASSIGNMENT]
+CODE_NEWLINE = TOKEN_CODES[TOKEN_NEWLINE]
+CODE_EOF = TOKEN_CODES[TOKEN_EOF]
+
+
+class FastLexer:
+    """
+    A laxer producing exactly the same tokens and errors as `Lexer`.
+    Instead of walking the raw text one character at a time, the class
+    of the first character of every token is looked up in a
+    precomputed table, and the whole token is then sliced out of the
+    raw text with a compiled regular expression.
+
+    Tokens are collected into a compact `TokenStream`, which `Parser`
+    consumes directly.
+    """
+    # The raw text to process
+    raw: str
+    # File context
+    file: File
+    # Whether newlines are emitted as tokens separating top-level
+    # expressions, rather than being unexpected
+    multiline: bool
+
+    def __init__(self, raw: str, file: File, multiline: bool = False) -> None:
+        self.raw = raw
+        self.file = file
+        self.multiline = multiline
+
+    def get_tokens(self) -> Tuple[List[Token], Error or None]:
+        stream, error = self.get_token_stream()
+        if error:
+            return [], error
+        return stream.to_tokens(), None
+
+    def get_token_stream(self, start: int = 0, end: int = None) -> Tuple[TokenStream or None, Error or None]:
+        """
+        Return the tokens of the raw text between index `start` and
+        index `end`, followed by an EOF token.
+        """
+        raw = self.raw
+        file = self.file
+        length = len(raw) if end is None else end
+        multiline = self.multiline
+        stream = TokenStream(file)
+        append = stream.append
+        idx = start
+
+        while idx < length:
+            char = raw[idx]
+            char_class = CHAR_CLASSES.get(char)
+
+            if char_class == CHAR_SPACE:
+                idx = _SPACES_PATTERN.match(raw, idx).end()
+                continue
+            # Same as `Lexer.get_assignment`: the longest run of assignment
+            # characters must be an assignment operator, otherwise we fall
+            # through to the cases below.
+            if char in ASSIGNMENT_OP_CHAR:
+                end = _ASSIGNMENT_PATTERN.match(raw, idx).end()
+                parsed_str = raw[idx:end]
+                if parsed_str in ASSIGNMENT_OP:
+                    append(CODE_ASSIGNMENT, parsed_str, idx, end)
+                    idx = end
+                    continue
+            if char_class == CHAR_DIGIT:
+                end = _NUMBER_PATTERN.match(raw, idx).end()
+                parsed_str = raw[idx:end]
+                if "." not in parsed_str:
+                    append(CODE_INT, int(parsed_str), idx, end)
+                else:
+                    append(CODE_FLOAT, float(parsed_str), idx, end)
+                idx = end
+                continue
+            if char_class == CHAR_LETTER:
+                end = _IDENTIFIER_PATTERN.match(raw, idx).end()
+                # Keywords in Jimmy Script will not be case sensitive
+                parsed_str = raw[idx:end].lower()
+                code = CODE_KEYWORD if parsed_str in KEYWORDS else CODE_IDENTIFIER
+                append(code, parsed_str, idx, end)
+                idx = end
+                continue
+            if char_class == CHAR_OP:
+                append(OP_CODES[char], None, idx, idx)
+                idx += 1
+                continue
+            if char_class == CHAR_NEWLINE and multiline:
+                append(CODE_NEWLINE, None, idx, idx)
+                idx += 1
+                continue
+
+            # Unexpected character
+            return None, UnexpectedTokenError(
+                f"Unexpected token '{char}'.",
+                Interval.from_position(OffsetPosition(idx, file), file)
+            )
+
+        append(CODE_EOF, None, idx, idx)
+        return stream, None
+
+    def get_token_stream_sliced(self, slice_size: int) \
+            -> Generator[None, None, Tuple[TokenStream or None, Error or None]]:
+        """
+        Return the same tokens and error as `get_token_stream`, lexing
+        complete lines of about `slice_size` characters at a time, and
+        generating None after every slice but the last. No token spans a
+        newline, so the lines of a slice are lexed as they would be in the
+        whole text.
+        """
+        raw = self.raw
+        stream = None
+        start = 0
+        while True:
+            end = raw.find(NEW_LINE, start + slice_size)
+            end = len(raw) if end < 0 else end + 1
+            tokens, error = self.get_token_stream(start, end)
+            if error:
+                return None, error
+            if stream is None:
+                stream = tokens
+            else:
+                stream.extend(tokens)
+            if end >= len(raw):
+                return stream, None
+            start = end
+            yield
+
+
+def is_identifier(name: str) -> bool:
+    """
+    Return whether code made of `name` alone is read as one identifier
+    with that exact name, i.e. whether code can use a variable of that
+    name.
+    """
+    tokens, error = FastLexer(name, File("<identifier>", name)).get_token_stream()
+    return error is None and len(tokens) == 2 and tokens.get_type(0) == TOKEN_IDENTIFIER and tokens.values[0] == name
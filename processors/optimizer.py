@@ -0,0 +1,224 @@
+from typing import Dict, Generator
+
+from models.token import *
+from nodes.bin_op_node import BinOpNode
+from nodes.node import Node
+from nodes.number_node import NumberNode
+from nodes.unary_op_node import UnaryOpNode
+from nodes.var_access_node import VarAccessNode
+from nodes.var_assign_node import VarAssignNode
+from processors.direct_interpreter import BIN_OPS
+from utils import run_to_end
+from values.number import Number, power_bit_length, value_key
+
+# Products and powers are not folded when the result would have more
+# bits than this, so that optimizing a program stays cheap.
+MAX_FOLDED_INT_BITS = 4096
+
+
+def get_children(node: Node) -> list:
+    if isinstance(node, BinOpNode):
+        return [node.left, node.right]
+    if isinstance(node, UnaryOpNode):
+        return [node.child]
+    if isinstance(node, VarAssignNode):
+        return [node.value_node]
+    return []
+
+
+class Optimizer:
+    """
+    An optimization pass rewriting an AST into one evaluating to the same
+    values and errors, with less work:
+
+    - Operations on numbers only are folded into a number. Operations
+      failing at run time, like 1/0, are left as-is, so that they still
+      fail at run time with the same error.
+    - x-0 is reduced to x, keeping the interval of the whole operation.
+      It is the only identity giving exactly x for every int, float and
+      complex x: x+0 and 0+x turn -0.0 into 0.0, x/1 turns an int into a
+      float, and x*1, 1*x and x^1 change the sign of zeros in complex
+      numbers, which powers of negative numbers produce.
+
+    Nodes are never modified, unchanged subtrees are shared with the
+    original tree.
+
+    Every engine runs the optimized tree, but common subexpressions are
+    not eliminated here: only the vm and python engines share them, when
+    compiling the tree, see `get_subexpression_ids`. The tree, direct,
+    arena and closure engines evaluate every occurrence.
+
+    Folded products and powers are not checked against any `Budget`, as
+    programs are shared by executions with different budgets. Instead,
+    the bit length of every folded integer product or power is kept in
+    `folds`. A statement with a fold over budget runs unoptimized, so
+    that the budget is checked where the value is computed.
+    """
+    # (bit length, interval of the right operand) of every product or
+    # power of integers folded by the last call to `optimize`, in the
+    # order they would have been computed
+    folds: list
+
+    def optimize(self, root: Node) -> Node:
+        return run_to_end(self.optimize_sliced(root))
+
+    def optimize_sliced(self, root: Node, slice_size: int = None) -> Generator[None, None, Node]:
+        """
+        Optimize an AST like `optimize`. If `slice_size` is given, None is
+        generated whenever `slice_size` nodes have been visited since the
+        last time.
+        """
+        self.folds = []
+        # Optimized nodes whose parent has not been optimized yet
+        optimized = []
+        # Number of nodes visited since the last pause
+        visited = 0
+        stack = [(root, False)]
+        while stack:
+            if slice_size is not None:
+                visited += 1
+                if visited >= slice_size:
+                    visited = 0
+                    yield
+            node, children_optimized = stack.pop()
+            children = get_children(node)
+            if children_optimized or not children:
+                new_children = optimized[len(optimized) - len(children):]
+                del optimized[len(optimized) - len(children):]
+                optimized.append(self.optimize_node(node, new_children))
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+        return optimized[0]
+
+    def optimize_node(self, node: Node, children: list) -> Node:
+        if isinstance(node, BinOpNode):
+            return self.optimize_bin_op(node, children[0], children[1])
+        if isinstance(node, UnaryOpNode):
+            child = children[0]
+            if isinstance(child, NumberNode):
+                value = 0 - child.token.value if node.token.type == TOKEN_MINUS else child.token.value
+                return self.make_number(value, node)
+            if child is not node.child:
+                return self.make_unary_op(node, child)
+        if isinstance(node, VarAssignNode) and children[0] is not node.value_node:
+            return VarAssignNode(node.token, children[0], node.slot)
+        return node
+
+    def optimize_bin_op(self, node: BinOpNode, left: Node, right: Node) -> Node:
+        op_type = node.token.type
+
+        if isinstance(left, NumberNode) and isinstance(right, NumberNode):
+            value = self.fold(op_type, left.token.value, right.token.value)
+            if value is not None:
+                if op_type in (TOKEN_MULTIPLY, TOKEN_POWER) and type(value) is int:
+                    self.folds.append((value.bit_length(), right.interval))
+                return self.make_number(value, node)
+
+        # The other operand must not be an assignment, whose value is None
+        if op_type == TOKEN_MINUS and self.is_zero(right) and not isinstance(left, VarAssignNode):
+            return self.make_identity(node, left)
+
+        if left is node.left and right is node.right:
+            return node
+        return BinOpNode(node.token, left, right)
+
+    @staticmethod
+    def fold(op_type: str, left: any, right: any) -> any:
+        """
+        Return the result of an operation on two numbers, or None if the
+        operation fails or is too expensive.
+        """
+        if op_type == TOKEN_POWER and power_bit_length(left, right) > MAX_FOLDED_INT_BITS:
+            return None
+        if op_type == TOKEN_MULTIPLY and isinstance(left, int) and isinstance(right, int) and \
+                left.bit_length() + right.bit_length() > MAX_FOLDED_INT_BITS:
+            return None
+
+        op = BIN_OPS.get(op_type)
+        if op is None:
+            return None
+        try:
+            result, error = op(Number(left), Number(right))
+        except (ArithmeticError, ValueError):
+            return None
+        if error is not None or type(result.value) not in (int, float):
+            return None
+        return result.value
+
+    @staticmethod
+    def is_zero(node: Node) -> bool:
+        return isinstance(node, NumberNode) and type(node.token.value) is int and node.token.value == 0
+
+    @staticmethod
+    def make_number(value: any, node: Node) -> NumberNode:
+        t_type = TOKEN_INT if isinstance(value, int) else TOKEN_FLOAT
+        return NumberNode(Token(t_type, value, node.interval))
+
+    @staticmethod
+    def make_unary_op(node: UnaryOpNode, child: Node) -> UnaryOpNode:
+        return UnaryOpNode(node.token, child)
+
+    @staticmethod
+    def make_identity(node: BinOpNode, operand: Node) -> UnaryOpNode:
+        # A plus sign gives the value of its operand the interval of the
+        # whole operation.
+        identity = UnaryOpNode(Token(TOKEN_PLUS, None, node.token.interval), operand)
+        identity.interval = node.interval
+        return identity
+
+
+def get_subexpression_ids(root: Node) -> Dict[int, int]:
+    """
+    Number the distinct subexpressions of an AST, so that two nodes have
+    the same number if and only if their subtrees are identical. Return a
+    dictionary mapping the id() of every node to its number. Used by the
+    compilers of the vm and python engines, the only ones evaluating
+    common subexpressions once.
+    """
+    numbers = {}
+    keys = {}
+    stack = [(root, False)]
+    while stack:
+        node, children_numbered = stack.pop()
+        children = get_children(node)
+        if children and not children_numbered:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+            continue
+
+        key = (type(node), node.token.type, value_key(node.token.value)) + \
+            tuple(numbers[id(child)] for child in children)
+        numbers[id(node)] = keys.setdefault(key, len(keys))
+    return numbers
+
+
+def get_assignment_dependent_ids(root: Node) -> set:
+    """
+    Return the id() of every node of an AST whose value may change while
+    the statement runs: nodes containing an assignment, and nodes reading
+    a variable assigned anywhere in the statement. Such nodes must be
+    evaluated every time, and never shared as common subexpressions.
+    """
+    assigned = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, VarAssignNode):
+            assigned.add(node.slot)
+        stack.extend(get_children(node))
+    if not assigned:
+        return set()
+
+    dependent = set()
+    stack = [(root, False)]
+    while stack:
+        node, children_visited = stack.pop()
+        children = get_children(node)
+        if children and not children_visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+        elif isinstance(node, VarAssignNode) or isinstance(node, VarAccessNode) and node.slot in assigned \
+                or any(id(child) in dependent for child in children):
+            dependent.add(id(node))
+    return dependent
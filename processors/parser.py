@@ -1,10 +1,12 @@
-from typing import List
+from typing import Generator, List, Iterator
 
 from errors.bad_syntax_error import BadSyntaxError
 from nodes.bin_op_node import BinOpNode
 from nodes.number_node import NumberNode
 from nodes.unary_op_node import UnaryOpNode
+from models.symbol_table import SymbolTable
 from models.token import *
+from models.token_stream import TokenStream
 from nodes.var_access_node import VarAccessNode
 from nodes.var_assign_node import VarAssignNode
 from processors.promises import ParserPromise
@@ -12,66 +14,121 @@ from processors.promises import ParserPromise
 
 class Parser:
     """
-    A parser takes in a list of tokens and parse the tokens
+    A parser takes in a stream of tokens and parse the tokens
     into a abstract syntax tree.
+
+    `Token` objects are only materialized for the tokens that end up
+    in the tree, and for error reporting.
     """
     # Tokens to process
-    tokens: List[Token]
-    # Current index in the tokens array
+    tokens: TokenStream
+    # Current index in the token stream
     curr_idx: int
-    # Current token being processed
-    curr: Token or None
-
-    def __init__(self, tokens: List[Token]):
+    # Type of the current token being processed
+    curr_type: str or None
+    # Symbol table giving the slots of the identifiers in the tree, the
+    # same for every statement parsed by this parser
+    symbol_table: SymbolTable
+
+    def __init__(self, tokens: TokenStream or List[Token]):
+        if not isinstance(tokens, TokenStream):
+            tokens = TokenStream.from_tokens(tokens)
         self.tokens = tokens
+        self.symbol_table = SymbolTable()
         self.curr_idx = 0
-        self.curr = tokens[0] if len(tokens) > 0 else None
+        self.curr_type = tokens.get_type(0) if len(tokens) > 0 else None
+
+    @property
+    def curr(self) -> Token or None:
+        """ The current token being processed, for debugging. """
+        if self.curr_idx >= len(self.tokens):
+            return None
+        return self.tokens.get_token(self.curr_idx)
 
     def next(self):
-        self.curr_idx += 1
-        if self.curr_idx < len(self.tokens):
-            self.curr = self.tokens[self.curr_idx]
+        if self.curr_idx + 1 < len(self.tokens):
+            self.curr_idx += 1
+            self.curr_type = self.tokens.get_type(self.curr_idx)
+
+    def curr_token(self) -> Token:
+        return self.tokens.get_token(self.curr_idx)
+
+    def curr_interval(self) -> Interval:
+        return self.tokens.get_interval(self.curr_idx)
 
     def parse(self):
         promise = self.expr()
-        if not promise.error and self.curr.type != TOKEN_EOF:
-            error = BadSyntaxError("Invalid expression. Expecting at least one operator.", self.curr.interval)
+        if not promise.error and self.curr_type != TOKEN_EOF:
+            error = BadSyntaxError("Invalid expression. Expecting at least one operator.", self.curr_interval())
             return promise.reject(error)
         return promise
 
+    def parse_statements(self, slice_size: int = None) -> Iterator[ParserPromise or None]:
+        """
+        Parse top-level expressions separated by newlines, one at a
+        time. After a bad expression, parsing resumes on the next line.
+        If `slice_size` is given, None is also generated within long
+        expressions, see `expr_sliced`.
+        """
+        while True:
+            while self.curr_type == TOKEN_NEWLINE:
+                self.next()
+            if self.curr_type == TOKEN_EOF:
+                return
+
+            promise = yield from self.expr_sliced(slice_size)
+            if not promise.error and self.curr_type not in (TOKEN_NEWLINE, TOKEN_EOF):
+                error = BadSyntaxError("Invalid expression. Expecting at least one operator.", self.curr_interval())
+                promise.reject(error)
+            if promise.error:
+                while self.curr_type not in (TOKEN_NEWLINE, TOKEN_EOF):
+                    self.next()
+            yield promise
+
+    def expr_sliced(self, slice_size: int = None) -> Generator[None, None, ParserPromise]:
+        """
+        Parse an expression like `expr`, generating None between slices of
+        about `slice_size` tokens. This parser reads an expression at once.
+        """
+        return self.expr()
+        # Never reached, makes this function a generator
+        yield
+
     def atom(self):
         """
         An "atom" is a number by itself or an open bracket followed by some expression then
         followed by a closing bracket.
         """
         promise = ParserPromise()
-        token = self.curr
+        token_type = self.curr_type
 
         # A bracket with some expressions in it is also considered to be
         # an "atom" node.
-        if token.type == TOKEN_LBRACKET:
+        if token_type == TOKEN_LBRACKET:
             promise.register(self.next())
             expr = promise.register(self.expr())
             if promise.error:
                 return promise
-            if self.curr.type == TOKEN_RBRACKET:
+            if self.curr_type == TOKEN_RBRACKET:
                 promise.register(self.next())
                 return promise.resolve(expr)
             else:
-                error = BadSyntaxError("Missing ')'.", self.curr.interval)
+                error = BadSyntaxError("Missing ')'.", self.curr_interval())
                 return promise.reject(error)
 
         # A number token by itself is an "atom" node
-        elif token.type in NUMBER_TOKENS:
+        elif token_type in NUMBER_TOKENS:
+            token = self.curr_token()
             promise.register(self.next())
             return promise.resolve(NumberNode(token))
 
         # A variable is considered to be an "atom" node.
-        elif token.type == TOKEN_IDENTIFIER:
+        elif token_type == TOKEN_IDENTIFIER:
+            token = self.curr_token()
             promise.register(self.next())
-            return promise.resolve(VarAccessNode(token))
+            return promise.resolve(VarAccessNode(token, self.symbol_table.intern(token.value)))
 
-        return promise.reject(BadSyntaxError(f"Expecting a number, sign, or bracket.", token.interval))
+        return promise.reject(BadSyntaxError(f"Expecting a number, sign, or bracket.", self.curr_interval()))
 
     def power(self):
         return self.bin_op(self.atom, [TOKEN_POWER], self.factor)
@@ -82,11 +139,11 @@ class Parser:
         A factor is a number with plus or minus sign.
         """
         promise = ParserPromise()
-        token = self.curr
 
         # Additional (plus/minus) in front of a factor is
         # also considered to be a part of the factor.
-        if token.type in [TOKEN_PLUS, TOKEN_MINUS]:
+        if self.curr_type in [TOKEN_PLUS, TOKEN_MINUS]:
+            token = self.curr_token()
             promise.register(self.next())
             factor = promise.register(self.factor())
             if promise.error:
@@ -114,25 +171,27 @@ class Parser:
         # Evaluate variable assignment grammar:
         # let `identifier` = `expr`, OR,
         # let `identifier` be `expr`.
-        if self.curr == Token(TOKEN_KEYWORD, "let"):
+        if self.curr_type == TOKEN_KEYWORD and self.tokens.values[self.curr_idx] == "let":
             promise.register(self.next())
 
-            if self.curr.type != TOKEN_IDENTIFIER:
+            if self.curr_type != TOKEN_IDENTIFIER:
                 return promise.reject(
-                    BadSyntaxError("Identifier expected after let keyword.", self.curr.interval))
+                    BadSyntaxError("Identifier expected after let keyword.", self.curr_interval()))
 
-            identifier = self.curr
+            identifier = self.curr_token()
+            slot = self.symbol_table.intern(identifier.value)
             promise.register(self.next())
 
-            if self.curr.type != TOKEN_ASSIGNMENT and \
-                    self.curr.type != TOKEN_KEYWORD:
-                return promise.reject(BadSyntaxError(f"Invalid assignment operator {self.curr}.", self.curr.interval))
+            if self.curr_type != TOKEN_ASSIGNMENT and \
+                    self.curr_type != TOKEN_KEYWORD:
+                return promise.reject(BadSyntaxError(f"Invalid assignment operator {self.curr_token()}.",
+                                                     self.curr_interval()))
 
             promise.register(self.next())
             expr = promise.register(self.expr())
             if promise.error:
                 return promise
-            return promise.resolve(VarAssignNode(identifier, expr))
+            return promise.resolve(VarAssignNode(identifier, expr, slot))
 
         return self.bin_op(self.term, [TOKEN_PLUS, TOKEN_MINUS])
 
@@ -145,8 +204,8 @@ class Parser:
         if promise.error:
             return promise
 
-        while self.curr.type in operations:
-            token = self.curr
+        while self.curr_type in operations:
+            token = self.curr_token()
             promise.register(self.next())
             right = promise.register(right_func())
             if promise.error:
@@ -0,0 +1,77 @@
+from typing import Iterator, Tuple
+
+from errors.error import Error
+from models.position import FileChunk, NEW_LINE
+from models.token_stream import TokenStream
+from processors.laxer import FastLexer
+
+# Number of characters (or bytes) to read at a time
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class StreamLexer:
+    """
+    A laxer that reads code from a file object or a memory-mapped buffer
+    in chunks of complete lines, and generates the tokens of one chunk at
+    a time. Memory use depends on the chunk size, not on the size of the
+    file. Within the code, newlines separate top-level expressions.
+    """
+    # File object or memory-mapped buffer to read from. Anything with
+    # `read` and `readline` methods returning `str` or `bytes` works.
+    source: any
+    # Name of the file
+    name: str
+    # Number of characters (or bytes) to read at a time. Chunks are
+    # extended to the end of the line they stop in.
+    chunk_size: int
+    # Encoding used to decode `bytes` sources
+    encoding: str
+
+    def __init__(self, source: any, name: str, chunk_size: int = DEFAULT_CHUNK_SIZE, encoding: str = "utf-8"):
+        self.source = source
+        self.name = name
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+
+    def read_chunks(self) -> Iterator[str]:
+        while True:
+            chunk = self.source.read(self.chunk_size)
+            if not chunk:
+                return
+            chunk += self.source.readline()
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode(self.encoding)
+            yield chunk
+
+    def get_token_streams(self) -> Iterator[Tuple[TokenStream or None, Error or None]]:
+        """
+        Generate the tokens of the file, one chunk at a time. When a line
+        contains an unexpected token, the tokens of the lines before it
+        are generated first, then the error, and lexing resumes on the
+        next line.
+        """
+        first_row = 0
+        for chunk in self.read_chunks():
+            file = FileChunk(self.name, chunk, first_row)
+            lexer = FastLexer(chunk, file, multiline=True)
+            start = 0
+
+            while start < len(chunk):
+                tokens, error = lexer.get_token_stream(start)
+                if not error:
+                    yield tokens, None
+                    break
+
+                error_idx = error.interval.start.idx
+                line_start = chunk.rfind(NEW_LINE, 0, error_idx) + 1
+                if line_start > start:
+                    tokens, _ = lexer.get_token_stream(start, line_start)
+                    yield tokens, None
+                yield None, error
+
+                start = chunk.find(NEW_LINE, error_idx)
+                if start < 0:
+                    break
+                start += 1
+
+            first_row += chunk.count(NEW_LINE)
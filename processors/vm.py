@@ -0,0 +1,134 @@
+from typing import Generator, Tuple
+
+from errors.error import Error
+from errors.interpret_error import InterpretError
+from models.bytecode import *
+from models.context import ExecutionContext
+from nodes.node import Node
+from processors.compiler import Compiler
+from values.number import Number
+
+# Number of instructions run between two pauses of `run_sliced`
+DEFAULT_SLICE_SIZE = 1000
+
+
+class VirtualMachine:
+    """
+    An execution engine running `Bytecode` on an explicit operand stack,
+    producing the same results and errors as `Interpreter`. Values on the
+    stack are plain Python numbers, and are only wrapped in a `Number`
+    when they are returned or assigned to a variable.
+    """
+
+    def compile(self, node: Node) -> Bytecode:
+        return Compiler().compile(node)
+
+    def compile_sliced(self, node: Node, slice_size: int) -> Generator[None, None, Bytecode]:
+        """ Compile like `compile`, in slices, see `Compiler.compile_sliced`. """
+        return Compiler().compile_sliced(node, slice_size)
+
+    def run(self, bytecode: Bytecode, context: ExecutionContext) -> Tuple[any, Error or None]:
+        """
+        Run `bytecode`, returning the value and the error.
+        """
+        result = self.run_range(bytecode, context, [], [None] * bytecode.temp_count, 0, len(bytecode.code))
+        if result is None:
+            raise Exception("Bytecode does not end with RETURN.")
+        return result
+
+    def run_sliced(self, bytecode: Bytecode, context: ExecutionContext, slice_size: int = DEFAULT_SLICE_SIZE,
+                   offset: int = 0) -> Generator[None, None, Tuple[any, Error or None]]:
+        """
+        Run `bytecode` like `run`, pausing after every `slice_size`
+        instructions by yielding. The value and the error are returned
+        when the generator is exhausted. `offset` is the number of
+        instructions already executed in the current slice, for example
+        by earlier statements, so that the first pause comes sooner.
+        """
+        code_length = len(bytecode.code)
+        stack = []
+        temps = [None] * bytecode.temp_count
+        start = 0
+        stop = slice_size - offset
+        while True:
+            result = self.run_range(bytecode, context, stack, temps, start, min(stop, code_length))
+            if result is not None:
+                return result
+            if stop >= code_length:
+                raise Exception("Bytecode does not end with RETURN.")
+            yield
+            start, stop = stop, stop + slice_size
+
+    def run_range(self, bytecode: Bytecode, context: ExecutionContext, stack: list, temps: list,
+                  start: int, stop: int) -> Tuple[any, Error or None] or None:
+        """
+        Run the instructions of `bytecode` from `start` up to `stop` on
+        `stack` and `temps`. Return the value and the error if the
+        bytecode returns or fails on the way, or None if it has not
+        finished yet.
+        """
+        code = bytecode.code
+        args = bytecode.args
+        constants = bytecode.constants
+        names = bytecode.names
+        register = context.variable_register
+        slots = bytecode.get_slots(register.symbol_table)
+        budget = context.budget
+        push = stack.append
+        pop = stack.pop
+
+        for ip in range(start, stop):
+            opcode = code[ip]
+            if opcode == LOAD_CONST:
+                push(constants[args[ip]])
+            elif opcode == LOAD_TEMP:
+                push(temps[args[ip]])
+            elif opcode == STORE_TEMP:
+                temps[args[ip]] = stack[-1]
+            elif opcode == LOAD_NAME:
+                var_value = register.lookup(slots[args[ip]])
+                if var_value is None:
+                    return None, InterpretError(f"Unknown identifier '{names[args[ip]]}'.",
+                                                bytecode.get_interval(ip), context)
+                push(var_value.value)
+            elif opcode == ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif opcode == SUBTRACT:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif opcode == MULTIPLY:
+                right = pop()
+                if budget is not None:
+                    error = budget.check_multiply(stack[-1], right, bytecode.get_interval(ip), context)
+                    if error is not None:
+                        return None, error
+                stack[-1] = stack[-1] * right
+            elif opcode == DIVIDE:
+                right = pop()
+                if right == 0:
+                    return None, InterpretError("Cannot divide by 0.", bytecode.get_interval(ip), context)
+                stack[-1] = stack[-1] / right
+            elif opcode == POWER:
+                right = pop()
+                if budget is not None:
+                    error = budget.check_power(stack[-1], right, bytecode.get_interval(ip), context)
+                    if error is not None:
+                        return None, error
+                stack[-1] = stack[-1] ** right
+            elif opcode == NEGATE:
+                stack[-1] = 0 - stack[-1]
+            elif opcode == STORE_NAME:
+                value = pop()
+                if value is not None:
+                    value = Number(value, bytecode.get_interval(ip), context)
+                register.store(slots[args[ip]], value)
+                push(None)
+            elif opcode == RETURN:
+                value = pop()
+                if value is not None:
+                    value = Number(value, bytecode.get_interval(ip), context)
+                return value, None
+            else:
+                raise Exception(f"Unknown opcode {opcode}.")
+        return None
@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import jimmy_script
+from models.budget import Budget
+from models.metrics import ServerMetrics
+from processors.laxer import is_identifier
+from values.number import Number
+
+# Longest request line accepted, in bytes
+MAX_LINE_LENGTH = 16 * 1024 * 1024
+# Largest number of bindings accepted in a request
+MAX_BINDINGS = 1024
+# Longest name of a binding accepted, in characters
+MAX_BINDING_NAME_LENGTH = 256
+
+# Request outcomes, as reported in metrics
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_BAD_REQUEST = "bad_request"
+OUTCOME_INTERNAL_ERROR = "internal_error"
+
+
+def to_json_value(value: any) -> any:
+    """
+    Return a value as it is sent in a response. JSON has no numbers for
+    complex numbers, infinities and NaN, so they are sent as text, and so
+    are integers with more digits than Python turns into text, in
+    hexadecimal.
+    """
+    if isinstance(value, complex):
+        return str(value)
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, int):
+        max_digits = sys.get_int_max_str_digits()
+        if max_digits and value.bit_length() * math.log10(2) + 1 > max_digits:
+            return hex(value)
+    return value
+
+
+class EvaluationServer:
+    """
+    An asyncio server evaluating Jimmy Script code. Every request is a
+    line of JSON with the code to execute ("source"), and optionally
+    variables to set first ("bindings"), the session to execute it in
+    ("session"), and an identifier echoed in the response ("id"). Every
+    response is a line of JSON with the "id", the "value" and the "error"
+    (printed as text), in the same order as the requests.
+
+    Binding names must be identifiers as the lexer reads them, at most
+    `MAX_BINDING_NAME_LENGTH` characters long, and a request has at most
+    `MAX_BINDINGS` of them, so that clients cannot fill a session with
+    names no code can use.
+
+    Requests on one connection may be pipelined: they are read and
+    evaluated while earlier ones are still running, up to
+    `pipeline_depth` of them, after which the connection is not read
+    until a response is written. Evaluations run in a thread pool, at
+    most `max_pending` at once across all connections. Requests of the
+    same session run one after the other; requests without a session
+    run in a new one.
+    """
+    # Executor running evaluations
+    executor: ThreadPoolExecutor
+    # Maximum number of requests read ahead of their responses on one
+    # connection
+    pipeline_depth: int
+    # Semaphore limiting the number of evaluations in the executor
+    pending: asyncio.Semaphore or None
+    # Maximum number of evaluations in the executor
+    max_pending: int
+    # Dictionary mapping session id to the session and its lock, the
+    # least recently used first
+    sessions: OrderedDict
+    # Maximum number of sessions kept
+    max_sessions: int
+    # Keyword arguments of the `Budget` of every evaluation, or None
+    budget_limits: dict or None
+    # Counters and latency histograms
+    metrics: ServerMetrics
+
+    def __init__(self, workers: int = 4, max_pending: int = None, pipeline_depth: int = 64,
+                 max_sessions: int = 1024, budget_limits: dict = None):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="jimmy-script")
+        self.max_pending = max_pending or workers * 4
+        self.pending = None
+        self.pipeline_depth = pipeline_depth
+        self.sessions = OrderedDict()
+        self.max_sessions = max_sessions
+        self.budget_limits = budget_limits
+        self.metrics = ServerMetrics()
+
+    async def start(self, host: str = None, port: int = None, unix_path: str = None,
+                    metrics_host: str = None, metrics_port: int = None) -> list:
+        """
+        Start listening on TCP if `port` is given, on a Unix socket if
+        `unix_path` is given, and serve metrics over HTTP if
+        `metrics_port` is given. Return the asyncio servers.
+        """
+        self.pending = asyncio.Semaphore(self.max_pending)
+        servers = []
+        if port is not None:
+            servers.append(await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE_LENGTH))
+        if unix_path is not None:
+            servers.append(await asyncio.start_unix_server(self.handle_connection, unix_path, limit=MAX_LINE_LENGTH))
+        if metrics_port is not None:
+            servers.append(await asyncio.start_server(self.handle_metrics, metrics_host, metrics_port))
+        return servers
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.metrics.connections += 1
+        self.metrics.connections_total += 1
+        # Responses of the requests read so far, in order
+        responses = asyncio.Queue(self.pipeline_depth)
+        write_task = asyncio.create_task(self.write_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    await responses.put(self.bad_request(None, "Request line too long.", time.monotonic()))
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    # Blocks once `pipeline_depth` responses are waiting
+                    await responses.put(asyncio.ensure_future(self.respond(line, time.monotonic())))
+        except ConnectionError:
+            pass
+        finally:
+            await responses.put(None)
+            await write_task
+            self.metrics.connections -= 1
+            writer.close()
+
+    @staticmethod
+    async def write_responses(responses: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        while True:
+            response = await responses.get()
+            if response is None:
+                return
+            if asyncio.isfuture(response):
+                response = await response
+            try:
+                line = json.dumps(response, allow_nan=False)
+            except (TypeError, ValueError) as e:
+                # Never leave the requests after this one unanswered
+                line = json.dumps({"id": None, "value": None, "error": f"Internal error: {e}"})
+            try:
+                writer.write(line.encode() + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                # Keep reading the queue, so that the reader never blocks
+                continue
+
+    async def respond(self, line: bytes, received: float) -> dict:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return self.bad_request(None, f"Invalid JSON: {e}.", received)
+        if not isinstance(request, dict):
+            return self.bad_request(None, "Request must be a JSON object.", received)
+
+        request_id = request.get("id")
+        source = request.get("source")
+        bindings = request.get("bindings") or {}
+        session_id = request.get("session")
+        if not isinstance(source, str):
+            return self.bad_request(request_id, "Field 'source' must be a string.", received)
+        if not isinstance(bindings, dict) or not all(
+                isinstance(value, (int, float)) and not isinstance(value, bool) for value in bindings.values()):
+            return self.bad_request(request_id, "Field 'bindings' must map names to numbers.", received)
+        if len(bindings) > MAX_BINDINGS:
+            return self.bad_request(request_id, f"Field 'bindings' has more than {MAX_BINDINGS} names.", received)
+        for name in bindings:
+            if len(name) > MAX_BINDING_NAME_LENGTH:
+                return self.bad_request(
+                    request_id, f"Binding name is longer than {MAX_BINDING_NAME_LENGTH} characters.", received)
+            if not is_identifier(name):
+                return self.bad_request(request_id, f"Binding name {json.dumps(name)} is not an identifier.", received)
+
+        if session_id is None:
+            session, lock = jimmy_script.Session(), None
+        else:
+            session, lock = self.get_session(str(session_id))
+
+        try:
+            if lock is None:
+                value, error = await self.run_in_executor(session, source, bindings)
+            else:
+                async with lock:
+                    value, error = await self.run_in_executor(session, source, bindings)
+            outcome = OUTCOME_OK if error is None else OUTCOME_ERROR
+        except Exception as e:
+            value, error = None, f"Internal error: {type(e).__name__}: {e}"
+            outcome = OUTCOME_INTERNAL_ERROR
+
+        self.metrics.observe_request(outcome, time.monotonic() - received)
+        return {"id": request_id, "value": value, "error": error}
+
+    async def run_in_executor(self, session: jimmy_script.Session, source: str, bindings: dict) -> tuple:
+        async with self.pending:
+            self.metrics.in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, self.evaluate, session, source, bindings)
+            finally:
+                self.metrics.in_flight -= 1
+
+    def evaluate(self, session: jimmy_script.Session, source: str, bindings: dict) -> tuple:
+        """
+        Evaluate a request in an executor thread. Return the value and the
+        error as they are sent back.
+        """
+        for name, value in bindings.items():
+            session.variable_register.set(name, Number(value))
+        budget = Budget(**self.budget_limits) if self.budget_limits else None
+        result, error = session.execute(source, "<request>", budget=budget)
+
+        value = None if result is None else to_json_value(result.value)
+        return value, None if error is None else str(error)
+
+    def get_session(self, session_id: str) -> tuple:
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            entry = self.sessions[session_id] = (jimmy_script.Session(), asyncio.Lock())
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(session_id)
+        return entry
+
+    def bad_request(self, request_id: any, msg: str, received: float) -> dict:
+        self.metrics.observe_request(OUTCOME_BAD_REQUEST, time.monotonic() - received)
+        return {"id": request_id, "value": None, "error": f"Bad request: {msg}"}
+
+    async def handle_metrics(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """ Answer any HTTP request with the metrics in the Prometheus text format. """
+        try:
+            # Skip the request line and the headers
+            while (await reader.readline()).strip():
+                pass
+            body = self.metrics.render(len(self.sessions)).encode()
+            writer.write(b"HTTP/1.0 200 OK\r\n"
+                         b"Content-Type: text/plain; version=0.0.4\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def parse_address(address: str) -> tuple:
+    """ Split "host:port" or ":port" into a host, or None, and a port. """
+    host, _, port = address.rpartition(":")
+    return host or None, int(port)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    budget_limits = {
+        "max_nodes": args.max_nodes,
+        "timeout": args.timeout,
+        "max_int_bits": args.max_int_bits,
+    }
+    server = EvaluationServer(args.workers, args.max_pending, args.pipeline_depth, args.max_sessions, budget_limits)
+    host, port = parse_address(args.tcp) if args.tcp else (None, None)
+    metrics_host, metrics_port = parse_address(args.metrics) if args.metrics else (None, None)
+    servers = await server.start(host, port, args.unix, metrics_host, metrics_port)
+    if not servers:
+        raise SystemExit("Nothing to listen on, give --tcp, --unix or both.")
+    try:
+        await asyncio.gather(*(s.serve_forever() for s in servers))
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Jimmy Script evaluations as newline-delimited JSON.")
+    parser.add_argument("--tcp", help="address to listen on, as host:port")
+    parser.add_argument("--unix", help="path of a Unix socket to listen on")
+    parser.add_argument("--metrics", help="address to serve metrics over HTTP on, as host:port")
+    parser.add_argument("--workers", type=int, default=4, help="number of evaluation threads")
+    parser.add_argument("--max-pending", type=int, help="maximum number of evaluations waiting or running")
+    parser.add_argument("--pipeline-depth", type=int, default=64, help="maximum requests read ahead per connection")
+    parser.add_argument("--max-sessions", type=int, default=1024, help="maximum number of sessions kept")
+    parser.add_argument("--max-nodes", type=int, default=1000000, help="maximum nodes evaluated per request")
+    parser.add_argument("--timeout", type=float, default=5.0, help="maximum seconds per request")
+    parser.add_argument("--max-int-bits", type=int, default=1 << 20, help="maximum bits of integer results")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
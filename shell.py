@@ -1,5 +1,10 @@
+import argparse
+import sys
+from typing import Iterator, Tuple
+
 import jimmy_script
 import pyfiglet
+from models.execution_stats import ExecutionStats
 from printy import printy
 
 
@@ -20,16 +25,117 @@ def print_banner():
     print()
 
 
+# Number of bytes written out at a time when running a file or a pipe
+OUTPUT_BUFFER_SIZE = 1 << 16
+# Engine running files and pipes. Every statement runs once, so compiling
+# it to bytecode first costs more than it saves, and the engine must not
+# recurse, so that deeply nested statements do not overflow the stack.
+STREAM_ENGINE = jimmy_script.ENGINE_ARENA
+
+# Whether to print the stats of every statement typed in the shell
+show_stats = False
+
+
+def print_results(results: Iterator[Tuple[any, any]], keep_going: bool = False) -> int:
+    """
+    Print the value of every statement that has one, and the errors,
+    through a buffered writer. A value too large to be printed counts as
+    an error. Stop at the first error unless `keep_going` is True, in
+    which case a summary of the errors is printed to stderr at the end.
+    Return the exit status.
+    """
+    statement_count = 0
+    error_count = 0
+    with open(sys.stdout.fileno(), "w", buffering=OUTPUT_BUFFER_SIZE, closefd=False) as out:
+        write = out.write
+        for result, error in results:
+            statement_count += 1
+            if not error and result is not None:
+                try:
+                    write(f"{result}\n")
+                    continue
+                except ValueError as e:
+                    error = f"Cannot print the value of statement {statement_count}: {e}"
+            if error:
+                error_count += 1
+                write(f"{error}\n")
+                if not keep_going:
+                    return 1
+
+    if keep_going:
+        print(f"Executed {statement_count} statements, {error_count} failed.", file=sys.stderr)
+    return 1 if error_count else 0
+
+
+def run_file(path: str, keep_going: bool = False) -> int:
+    """
+    Run a script file in one pass, printing the value of every statement
+    that has one. Stop at the first error unless `keep_going` is True.
+    """
+    return print_results(jimmy_script.execute_file(path, engine=STREAM_ENGINE), keep_going)
+
+
+def run_pipe(keep_going: bool = False) -> int:
+    """
+    Run the statements read from stdin when it is not a terminal, with
+    no banner and no prompt. Stdin is read in large chunks and every
+    statement runs in the same session. See `run_file`.
+    """
+    return print_results(jimmy_script.execute_stream(sys.stdin.buffer, "<stdin>", engine=STREAM_ENGINE), keep_going)
+
+
+def run_command(line: str) -> None:
+    """
+    Run a shell command, a line starting with ':'.
+        :save <path>    save the variables to a snapshot file
+        :load <path>    replace the variables with the ones in a snapshot file
+        :stats          turn printing the stats of every statement on or off
+    """
+    global show_stats
+    command, _, argument = line.strip()[1:].partition(" ")
+    argument = argument.strip()
+    try:
+        if command == "save" and argument:
+            count = jimmy_script.save_snapshot(argument)
+            print(f"Saved {count} variables to {argument}.")
+        elif command == "load" and argument:
+            count = jimmy_script.load_snapshot(argument)
+            print(f"Loaded {count} variables from {argument}.")
+        elif command == "stats" and not argument:
+            show_stats = not show_stats
+            print(f"Stats {'on' if show_stats else 'off'}.")
+        else:
+            print("Commands: :save <path>, :load <path>, :stats")
+    except (OSError, ValueError) as e:
+        print(f"Cannot {command} snapshot: {e}")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Jimmy Script code from a file, a pipe, or interactively.")
+    parser.add_argument("path", nargs="?", help="script file to run")
+    parser.add_argument("-k", "--keep-going", action="store_true",
+                        help="keep running after errors, and print a summary at the end")
+    args = parser.parse_args()
+    if args.path is not None:
+        exit(run_file(args.path, args.keep_going))
+    if not sys.stdin.isatty():
+        exit(run_pipe(args.keep_going))
+
     print_banner()
     while True:
         expr = input("jimmy-script > ")
         if expr.strip().lower() == "exit":
             print("Goodbye!")
             exit(0)
+        if expr.startswith(":"):
+            run_command(expr)
+            continue
 
-        result, error = jimmy_script.execute(expr, "<stdin>")
+        stats = ExecutionStats() if show_stats else None
+        result, error = jimmy_script.execute(expr, "<stdin>", stats=stats)
         if error:
             print(error)
         else:
             print(result) if result is not None else None
+        if stats is not None:
+            print(stats)
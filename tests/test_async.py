@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+import jimmy_script
+from models.budget import Budget
+
+
+async def execute_measuring_stalls(source: str, **kwargs) -> tuple:
+    """
+    Execute code with `execute_async` while another task keeps waking up,
+    returning the result and the longest time the event loop was held up.
+    """
+    session = jimmy_script.Session()
+    stalls = []
+    done = False
+
+    async def ticker():
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - started)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    result = await session.execute_async(source, "<test>", **kwargs)
+    done = True
+    await task
+    return result, max(stalls)
+
+
+@pytest.mark.parametrize("optimize", [False, True])
+def test_large_expression_does_not_block_the_event_loop(optimize):
+    source = " + ".join(["1 * 2"] * 10000)
+    (value, error), max_stall = asyncio.run(execute_measuring_stalls(source, optimize=optimize, slice_size=500))
+    assert error is None
+    assert value.value == 20000
+    assert max_stall < 0.2
+
+
+@pytest.mark.parametrize("slice_size", [1, 3, 1000])
+def test_same_results_as_execute(slice_size):
+    source = "let x = 2\nlet y = x^10 - 1\n(y/3) + -x\nx*y"
+    expected, _ = jimmy_script.Session().execute(source, "<test>")
+    value, error = asyncio.run(jimmy_script.Session().execute_async(source, "<test>", slice_size=slice_size))
+    assert error is None
+    assert value.value == expected.value
+
+
+def test_errors_and_budgets():
+    _, error = asyncio.run(jimmy_script.Session().execute_async("1 + 1/0", "<test>"))
+    assert "Cannot divide by 0." in str(error)
+    _, error = asyncio.run(jimmy_script.Session().execute_async("9^9^9^9", "<test>",
+                                                                budget=Budget(max_int_bits=1000)))
+    assert str(error).startswith("Budget Exceeded")
+
+
+@pytest.mark.parametrize("source", ["1 +\n2", "let x = 1\n(x", "1\n2 $ 3\n4", "1\n" * 3000 + "1 / 0"])
+def test_same_errors_as_execute(source):
+    expected = str(jimmy_script.Session().execute(source, "<test>")[1])
+    for slice_size in (1, 7, 1000):
+        _, error = asyncio.run(jimmy_script.Session().execute_async(source, f"<test {slice_size}>",
+                                                                    slice_size=slice_size))
+        assert str(error) == expected.replace("<test>", f"<test {slice_size}>")
@@ -0,0 +1,63 @@
+import pytest
+
+import jimmy_script
+from errors.budget_exceeded_error import BudgetExceededError
+from models.budget import Budget
+from nodes.number_node import NumberNode
+from processors.optimizer import get_children, MAX_FOLDED_INT_BITS
+
+ENGINES = list(jimmy_script.ENGINES)
+
+
+def run(source: str, engine: str, budget: Budget, optimize: bool = True) -> tuple:
+    return jimmy_script.Session().execute(source, "<test>", engine, optimize, budget)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("optimize", [True, False])
+@pytest.mark.parametrize("source", ["2^4000", "(2^60) * (2^60)", "let a = 3^100"])
+def test_folded_operations_respect_max_int_bits(engine, optimize, source):
+    value, error = run(source, engine, Budget(max_int_bits=64), optimize)
+    assert value is None
+    assert isinstance(error, BudgetExceededError)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("optimize", [True, False])
+def test_results_within_budget_are_computed(engine, optimize):
+    value, error = run("(2^30) * (2^30)", engine, Budget(max_int_bits=64), optimize)
+    assert error is None
+    assert value.value == 2 ** 60
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tower_of_powers_is_stopped(engine):
+    value, error = run("9^9^9^9", engine, Budget(max_int_bits=1 << 16))
+    assert isinstance(error, BudgetExceededError)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_max_nodes(engine):
+    value, error = run("1 + 1\n" * 10 + "a", engine, Budget(max_nodes=12), optimize=False)
+    assert isinstance(error, BudgetExceededError)
+
+
+def test_folding_caps_products():
+    program = jimmy_script.compile_program(" * ".join(["65535"] * 2000), "<test>")
+    stack = [program.nodes[0]]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, NumberNode) and isinstance(node.token.value, int):
+            assert node.token.value.bit_length() <= MAX_FOLDED_INT_BITS
+        stack.extend(get_children(node))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("optimize", [True, False])
+def test_folded_operations_are_charged_in_order(engine, optimize):
+    value, error = run("1/0 + 2^100", engine, Budget(max_int_bits=64), optimize)
+    assert not isinstance(error, BudgetExceededError)
+    assert error.msg == "Cannot divide by 0."
+
+    value, error = run("2^100 + 1/0", engine, Budget(max_int_bits=64), optimize)
+    assert isinstance(error, BudgetExceededError)
@@ -0,0 +1,202 @@
+"""
+Differential tests: random programs must give the same results and
+errors on every engine, with and without optimization, and the fast
+lexer and iterative parser must agree with the original ones.
+"""
+import math
+import random
+
+import pytest
+
+import jimmy_script
+from errors.interpret_error import NESTED_TOO_DEEPLY
+from models.budget import Budget
+from models.position import File
+from processors.interpreter import Interpreter
+from processors.iterative_parser import IterativeParser
+from processors.laxer import Lexer, FastLexer
+from processors.parser import Parser
+
+ATOMS = ["0", "1", "2", "3", "2.5", "0.0", "10", "x", "y", "z", "v"]
+OPERATORS = ["+", "-", "*", "/", "^"]
+SETUP = "let x = 3\nlet y = 0\nlet z = 2.0"
+# Result of using the value of an assignment, which is None, as an
+# operand. Such programs crash in different ways, or fail earlier with
+# another error, depending on the engine, so they are not compared.
+CRASH = ("crash",)
+# Result of an arithmetic error escaping as a Python exception, like
+# 0 ^ -1, which every engine must agree on
+ARITHMETIC_CRASH = ("arithmetic crash",)
+
+
+def random_expression(rng: random.Random, pool: list, depth: int = 0) -> str:
+    """
+    Return a random expression. Expressions already generated for the
+    statement are kept in `pool` and sometimes used again, so that
+    common subexpressions are shared by the engines that look for them.
+    """
+    r = rng.random()
+    if pool and r < 0.15:
+        return rng.choice(pool)
+    if depth > 4 or r < 0.35:
+        expression = rng.choice(ATOMS)
+    elif r < 0.45:
+        expression = rng.choice(["-", "+"]) + random_expression(rng, pool, depth + 1)
+    elif r < 0.55:
+        expression = "(" + random_expression(rng, pool, depth + 1) + ")"
+    elif r < 0.65:
+        # Nested assignments, whose value is None, and which change the
+        # variables read by the rest of the statement
+        expression = f"(let {rng.choice(['v', 'y'])} = {random_expression(rng, pool, depth + 1)})"
+    else:
+        left = random_expression(rng, pool, depth + 1)
+        right = random_expression(rng, pool, depth + 1)
+        expression = f"({left}{rng.choice(OPERATORS)}{right})"
+    pool.append(expression)
+    return expression
+
+
+def random_program(rng: random.Random) -> str:
+    statements = []
+    for _ in range(rng.randint(1, 3)):
+        statement = random_expression(rng, [])
+        if rng.random() < 0.3:
+            statement = f"let {rng.choice(['v', 'w'])} = {statement}"
+        statements.append(statement)
+    return "\n".join(statements)
+
+
+def describe_result(value: any, error: any) -> tuple:
+    if error:
+        interval = error.interval
+        return "error", error.msg, interval.start.idx, interval.end.idx, interval.start.row, interval.start.col
+    if value is None:
+        return "none",
+    number = value.value
+    text = "nan" if isinstance(number, float) and math.isnan(number) else repr(number)
+    interval = value.interval
+    return "value", type(number).__name__, text, interval and interval.start.idx, interval and interval.end.idx
+
+
+def run_reference(source: str) -> tuple:
+    """ Run a program statement by statement on the promise-based tree walk. """
+    session = jimmy_script.Session()
+    session.execute(SETUP, "<setup>")
+    program = jimmy_script.compile_program(source, "<test>", False)
+    if program.error:
+        return describe_result(None, program.error)
+    session.context.budget = Budget(max_int_bits=4096)
+    session.context.slots = program.get_slots(session.variable_register.symbol_table)
+    result = None
+    try:
+        for node in program.nodes:
+            result = Interpreter().traverse(node, session.context)
+            if result.error:
+                break
+    except (TypeError, AttributeError):
+        return CRASH
+    except ArithmeticError:
+        return ARITHMETIC_CRASH
+    return describe_result(result.value, result.error)
+
+
+def run(source: str, engine: str, optimize: bool) -> tuple:
+    session = jimmy_script.Session()
+    session.execute(SETUP, "<setup>")
+    try:
+        return describe_result(*session.execute(source, "<test>", engine, optimize, Budget(max_int_bits=4096)))
+    except (TypeError, AttributeError):
+        return CRASH
+    except ArithmeticError:
+        return ARITHMETIC_CRASH
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_engines_agree(seed):
+    rng = random.Random(seed)
+    for _ in range(400):
+        source = random_program(rng)
+        expected = run_reference(source)
+        if expected == CRASH:
+            continue
+        for engine in jimmy_script.ENGINES:
+            for optimize in (True, False):
+                assert run(source, engine, optimize) == expected, (source, engine, optimize)
+
+
+LEXER_ALPHABET = list("0123456789.+-*/^() \t=<-bebeletxyz_$A\n!") + ["let", "be", "<-", "bet", "bee"]
+
+
+def describe_tokens(tokens: list, error: any) -> tuple or list:
+    if error:
+        interval = error.interval
+        return error.name, error.msg, interval.start.idx, interval.start.row, interval.start.col, interval.end.idx
+    return [(token.type, token.value, type(token.value).__name__, token.interval.start.idx,
+             token.interval.start.row, token.interval.start.col, token.interval.end.idx, token.interval.end.col)
+            for token in tokens]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_fast_lexer_matches_lexer(seed):
+    rng = random.Random(seed)
+    for _ in range(5000):
+        text = "".join(rng.choice(LEXER_ALPHABET) for _ in range(rng.randint(0, 12)))
+        expected = describe_tokens(*Lexer(text, File("<test>", text)).get_tokens())
+        assert describe_tokens(*FastLexer(text, File("<test>", text)).get_tokens()) == expected, text
+
+
+PARSER_TOKENS = ["1", "2.5", "x", "y", "+", "-", "*", "/", "^", "(", ")", "let", "=", "be", "<-", " "]
+
+
+def describe_node(node: any) -> tuple or None:
+    name = type(node).__name__
+    interval = node.interval.start.idx, node.interval.end.idx
+    if name == "BinOpNode":
+        return (name, node.token.type, describe_node(node.left), describe_node(node.right)) + interval
+    if name == "UnaryOpNode":
+        return (name, node.token.type, describe_node(node.child)) + interval
+    if name == "VarAssignNode":
+        return (name, node.token.value, describe_node(node.value_node)) + interval
+    return (name, node.token.value) + interval
+
+
+def describe_ast(ast: any) -> tuple:
+    if ast.error:
+        return "error", ast.error.msg, ast.error.interval.start.idx, ast.error.interval.end.idx
+    return "node", describe_node(ast.node)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_iterative_parser_matches_parser(seed):
+    rng = random.Random(seed)
+    for _ in range(5000):
+        text = " ".join(rng.choice(PARSER_TOKENS) for _ in range(rng.randint(1, 10)))
+        tokens, error = FastLexer(text, File("<test>", text)).get_token_stream()
+        if error:
+            continue
+        assert describe_ast(IterativeParser(tokens).parse()) == describe_ast(Parser(tokens).parse()), text
+
+
+# Expressions nested deeper than Python's recursion limit, with and
+# without parts the optimizer folds
+DEEP_SOURCES = [
+    "x + " + "(1^" * 3000 + "1" + ")" * 3000,
+    "x + " + "(x^" * 3000 + "x" + ")" * 3000,
+    "-" * 20000 + "x",
+]
+
+
+@pytest.mark.parametrize("engine", jimmy_script.ENGINES)
+@pytest.mark.parametrize("optimize", [True, False])
+@pytest.mark.parametrize("source", DEEP_SOURCES)
+def test_deep_expressions(engine, optimize, source):
+    session = jimmy_script.Session()
+    session.execute("let x = 1", "<setup>")
+    value, error = session.execute(source, "<deep>", engine, optimize)
+    if error is None:
+        assert value.value == (2 if "+" in source else 1)
+    else:
+        # Engines recursing once per level of the AST give up on such
+        # expressions, with an error instead of an exception
+        assert engine in ("tree", "direct", "closure")
+        assert error.msg == NESTED_TOO_DEEPLY
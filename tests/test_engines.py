@@ -0,0 +1,49 @@
+import pytest
+
+import jimmy_script
+from processors.compiler import Compiler
+
+# Engines expected to agree with the tree interpreter on every program
+ENGINES = list(jimmy_script.ENGINES)
+
+
+def run(source: str, engine: str, optimize: bool = True) -> tuple:
+    """ Execute code in a new session, returning its value and the text of its error. """
+    value, error = jimmy_script.Session().execute(source, "<test>", engine, optimize)
+    return None if value is None else value.value, None if error is None else str(error)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("optimize", [True, False])
+def test_common_subexpression_is_not_reused_across_assignment(engine, optimize):
+    source = "let x = 1\nlet y = 2\n(x/y) + ((let y = 0) + (x/y))"
+    value, error = run(source, engine, optimize)
+    assert value is None
+    assert "Cannot divide by 0." in error
+
+
+def test_common_subexpressions_are_still_shared():
+    program = jimmy_script.compile_program("let x = 3\n(x*x) + (x*x)", "<test>", optimize=False)
+    bytecode = Compiler().compile(program.nodes[1])
+    assert bytecode.temp_count == 1
+
+
+def test_subexpressions_reading_assigned_variables_are_not_shared():
+    program = jimmy_script.compile_program("let y = (x*y) + (x*y)", "<test>", optimize=False)
+    assert Compiler().compile(program.nodes[0]).temp_count == 0
+
+    program = jimmy_script.compile_program("let z = (x*y) + (x*y)", "<test>", optimize=False)
+    assert Compiler().compile(program.nodes[0]).temp_count == 1
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_read_after_assignment_in_same_statement(engine):
+    # The division reads the value assigned by the statement itself
+    value, error = run("let y = 2\n(let y = 0) + (1/y)", engine)
+    assert "Cannot divide by 0." in error
+
+
+def test_generated_code_reloads_assigned_variables():
+    program = jimmy_script.compile_program("let y = 2\n(1/y) + ((let y = 0) + (1/y))", "<test>", optimize=False)
+    generated = jimmy_script.PythonCodeGenerator().compile(program.nodes[1])
+    assert generated.source.count("_load(") == 2
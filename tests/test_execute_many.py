@@ -0,0 +1,42 @@
+import pytest
+
+import jimmy_script
+from models.bytecode import Bytecode
+
+
+def serialized_size(lines: int) -> int:
+    program = jimmy_script.parse_program("\n".join(["let y = (x * 3 + 1) ^ 2 / (x + 1)"] * lines), "<test>")
+    return len(Bytecode.program_to_bytes(program.file, program.get_compiled(jimmy_script.ENGINE_VM,
+                                                                            jimmy_script.VirtualMachine())))
+
+
+def test_serialized_program_size_is_linear():
+    assert serialized_size(1000) < 12 * serialized_size(100)
+
+
+def test_program_round_trip_shares_file():
+    program = jimmy_script.parse_program("let a = 2\na ^ 10", "<test>")
+    statements = program.get_compiled(jimmy_script.ENGINE_VM, jimmy_script.VirtualMachine())
+    loaded = Bytecode.program_from_bytes(Bytecode.program_to_bytes(program.file, statements))
+    assert [repr(bytecode) for bytecode in loaded] == [repr(bytecode) for bytecode in statements]
+    assert loaded[0].file is loaded[1].file
+    assert loaded[0].file.content == program.file.content
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_results_and_errors(workers):
+    sources = ["x * 2", "let y = x\ny / (x - 1)", "1 +", "x * 2"]
+    results = jimmy_script.execute_many(sources, [{"x": 1}, {"x": 1}, {}, {"x": 4}], workers=workers,
+                                        chunk_size=1)
+    assert results[0][0].value == 2
+    assert results[1][0] is None
+    assert results[1][1].msg == "Cannot divide by 0."
+    assert "y / (x - 1)" in str(results[1][1])
+    assert results[2][0] is None and results[2][1] is not None
+    assert results[3][0].value == 8
+
+
+def test_compile_cache_is_untouched():
+    before = list(jimmy_script.compile_cache.keys())
+    jimmy_script.execute_many(["x + 1", "x + 2", "1 +"], {"x": 1}, workers=1)
+    assert list(jimmy_script.compile_cache.keys()) == before
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from processors.incremental import IncrementalParser
+
+ALPHABET = list("0123456789+-*/^() \n\n=x") + ["let x = ", "y", "be ", "?"]
+
+
+def describe(parser: IncrementalParser) -> list:
+    """ Return the trees, errors and node positions of a parser, to compare parsers. """
+    result = []
+    for node, error in parser.get_statements():
+        result.append(repr(node) if node is not None else str(error))
+        stack = [node] if node is not None else []
+        while stack:
+            node = stack.pop()
+            interval = node.interval
+            result.append((interval.start.row, interval.start.col, interval.end.row, interval.end.col))
+            stack.extend(getattr(node, name) for name in ("left", "right", "child", "value_node")
+                         if hasattr(node, name))
+    return result
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_edits_match_fresh_parse(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        text = random_text(rng, rng.randint(0, 40))
+        parser = IncrementalParser("<test>", text, block_size=2)
+        for _ in range(10):
+            offset = rng.randint(0, len(text))
+            deleted = rng.randint(0, min(rng.choice([5, 60]), len(text) - offset))
+            inserted = random_text(rng, rng.choice([0, 1, 5, 30]))
+            text = text[:offset] + inserted + text[offset + deleted:]
+            parser.edit(offset, deleted, inserted)
+
+            assert parser.text == text
+            assert len(parser) == len(text)
+            assert describe(parser) == describe(IncrementalParser("<test>", text))
+            assert [parser.get_row(idx) for idx in range(len(text) + 1)] == \
+                [text.count("\n", 0, idx) for idx in range(len(text) + 1)]
+
+
+def test_error_row_follows_inserted_lines():
+    parser = IncrementalParser("<test>", "1\n2\n1 +", block_size=2)
+    _, error = list(parser.get_statements())[-1]
+    assert "At Line 3 " in str(error)
+    parser.edit(0, 0, "\n\n")
+    assert "At Line 5 " in str(error)
+    parser.edit(0, 4, "")
+    assert "At Line 2 " in str(error)
+
+
+def test_edit_out_of_range():
+    parser = IncrementalParser("<test>", "1 + 2")
+    with pytest.raises(ValueError):
+        parser.edit(3, 3, "")
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import tempfile
+
+from server import EvaluationServer, MAX_BINDINGS, MAX_BINDING_NAME_LENGTH, to_json_value
+
+
+async def send_requests(requests: list, **kwargs) -> list:
+    server = EvaluationServer(workers=2, **kwargs)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "server.sock")
+        servers = await server.start(unix_path=path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            for request in requests:
+                line = request if isinstance(request, str) else json.dumps(request)
+                writer.write(line.encode() + b"\n")
+            await writer.drain()
+            responses = [json.loads(await asyncio.wait_for(reader.readline(), 10)) for _ in requests]
+            writer.close()
+            return responses
+        finally:
+            for s in servers:
+                s.close()
+            server.close()
+
+
+def test_pipelined_responses_are_in_order():
+    requests = [{"id": idx, "source": f"{idx} * 2", "session": "a"} for idx in range(50)]
+    responses = asyncio.run(send_requests(requests))
+    assert [r["id"] for r in responses] == list(range(50))
+    assert [r["value"] for r in responses] == [idx * 2 for idx in range(50)]
+
+
+def test_sessions_keep_variables():
+    responses = asyncio.run(send_requests([
+        {"id": 1, "source": "let x = 4", "session": "s"},
+        {"id": 2, "source": "x * x", "session": "s"},
+        {"id": 3, "source": "x", "session": "other"},
+    ]))
+    assert responses[1]["value"] == 16
+    assert "Unknown identifier" in responses[2]["error"]
+
+
+def test_values_json_cannot_hold_do_not_stop_the_connection():
+    responses = asyncio.run(send_requests([
+        {"id": 1, "source": "2^20000"},
+        {"id": 2, "source": "(0-1)^0.5"},
+        {"id": 3, "source": "1 + 1"},
+    ]))
+    assert responses[0]["value"] == hex(2 ** 20000)
+    assert isinstance(responses[1]["value"], str)
+    assert responses[2] == {"id": 3, "value": 2, "error": None}
+
+
+def test_bad_requests_are_answered():
+    responses = asyncio.run(send_requests(["not json", {"id": 1}, {"id": 2, "source": "1"}]))
+    assert responses[0]["error"].startswith("Bad request")
+    assert responses[1]["error"].startswith("Bad request")
+    assert responses[2]["value"] == 1
+
+
+def test_budget_applies_to_requests():
+    responses = asyncio.run(send_requests([{"id": 1, "source": "9^9^9^9"}],
+                                          budget_limits={"max_int_bits": 1 << 16}))
+    assert responses[0]["error"].startswith("Budget Exceeded")
+
+
+def test_to_json_value():
+    assert to_json_value(float("inf")) == "inf"
+    assert to_json_value(float("nan")) == "nan"
+    assert to_json_value(3) == 3
+    assert to_json_value(1.5) == 1.5
+
+
+def test_bad_binding_names_are_rejected():
+    responses = asyncio.run(send_requests([
+        {"id": 1, "source": "1", "bindings": {"let": 1}},
+        {"id": 2, "source": "1", "bindings": {"a b": 1}},
+        {"id": 3, "source": "1", "bindings": {"X": 1}},
+        {"id": 4, "source": "1", "bindings": {"x" * (MAX_BINDING_NAME_LENGTH + 1): 1}},
+        {"id": 5, "source": "1", "bindings": {f"x{idx}": idx for idx in range(MAX_BINDINGS + 1)}},
+        {"id": 6, "source": "x_1 + a$", "bindings": {"x_1": 1, "a$": 2}},
+    ]))
+    for response in responses[:5]:
+        assert response["error"].startswith("Bad request")
+        assert response["value"] is None
+    assert responses[5] == {"id": 6, "value": 3, "error": None}
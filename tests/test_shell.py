@@ -0,0 +1,28 @@
+import io
+
+import pytest
+
+pytest.importorskip("pyfiglet")
+pytest.importorskip("printy")
+
+import jimmy_script
+import shell
+
+
+def run(source: str, keep_going: bool) -> int:
+    results = jimmy_script.Session().execute_stream(io.BytesIO(source.encode()), "<test>",
+                                                    engine=shell.STREAM_ENGINE)
+    return shell.print_results(results, keep_going)
+
+
+def test_deeply_nested_statements(capfd):
+    assert run("-" * 20000 + "1\n" + " + ".join(["1"] * 20000) + "\n", False) == 0
+    assert capfd.readouterr().out == "1\n20000\n"
+
+
+@pytest.mark.parametrize("keep_going", [True, False])
+def test_value_too_large_to_print(capfd, keep_going):
+    assert run("2 ^ 20000\n1 + 1\n", keep_going) == 1
+    out = capfd.readouterr().out
+    assert out.startswith("Cannot print the value of statement 1:")
+    assert out.endswith("\n2\n") == keep_going
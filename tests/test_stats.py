@@ -0,0 +1,49 @@
+import pytest
+
+import jimmy_script
+from models.execution_stats import ExecutionStats, PHASE_PARSE, PHASE_OPTIMIZE
+
+ENGINES = list(jimmy_script.ENGINES)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stats_use_requested_engine_and_cache(engine):
+    source = "let a = 2\na * (a + 1)"
+    stats = ExecutionStats()
+    value, error = jimmy_script.Session().execute(source, f"<{engine}>", engine, stats=stats)
+    assert error is None
+    assert value.value == 6
+    program = jimmy_script.compile_program(source, f"<{engine}>")
+    assert list(program.compiled) == [engine]
+
+    stats = ExecutionStats()
+    jimmy_script.Session().execute(source, f"<{engine}>", engine, stats=stats)
+    assert stats.cached
+    assert stats.number_allocations > 0
+
+
+def test_allocations_are_counted_by_the_session_with_stats():
+    session = jimmy_script.Session()
+    stats = ExecutionStats()
+    session.execute("let a = 1\na + a", "<test>", "tree", stats=stats)
+    assert stats.number_allocations == 2
+    assert session.context.stats is None
+    session.execute("a + a", "<test>", "tree")
+    jimmy_script.Session().execute("1 + 2", "<test>", "tree")
+    assert stats.number_allocations == 2
+
+
+def test_token_count_excludes_newlines_and_end_of_file():
+    stats = ExecutionStats()
+    jimmy_script.Session().execute("let a = 2\n\na * (a + 1)\n", "<tokens>", stats=stats)
+    assert stats.token_count == 11
+
+
+def test_reused_stats_count_parse_time_of_every_call():
+    stats = ExecutionStats()
+    parse_time = 0
+    for idx in range(3):
+        jimmy_script.Session().execute(" + ".join(["(1 * 2)"] * 2000) + f" + {idx}", "<reused>", stats=stats)
+        assert stats.phase_times[PHASE_PARSE] > parse_time
+        assert stats.phase_times[PHASE_OPTIMIZE] > 0
+        parse_time = stats.phase_times[PHASE_PARSE]
@@ -0,0 +1,42 @@
+import gc
+import io
+import tracemalloc
+
+import pytest
+
+import jimmy_script
+
+# Lines filling most of a chunk, between assignments. Long numbers make
+# large chunks of few statements.
+FILLER = ("7" * 500 + "\n") * 30
+
+
+def make_script(assignments: int) -> str:
+    return "".join(f"let v{idx} = {idx} * 2\n" + FILLER for idx in range(assignments))
+
+
+@pytest.mark.parametrize("engine", ["arena", "vm"])
+def test_variables_do_not_keep_chunks_alive(engine):
+    source = make_script(100)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        session = jimmy_script.Session()
+        for _ in session.execute_stream(io.StringIO(source), "<test>", len(FILLER), engine):
+            pass
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(session.variable_register.variables) == 100
+    assert retained < len(source) // 10
+
+
+def test_released_values_keep_their_position():
+    session = jimmy_script.Session()
+    results = list(session.execute_stream(io.StringIO(make_script(3)), "<test>", len(FILLER)))
+    assert all(error is None for _, error in results)
+    value = session.variable_register.get("v2")
+    assert value.value == 4
+    assert (value.interval.start.row, value.interval.start.col) == (62, 9)
+    assert value.interval.file.content == "let v2 = 2 * 2"
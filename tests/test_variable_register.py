@@ -0,0 +1,90 @@
+import marshal
+import os
+import tempfile
+
+import pytest
+
+import jimmy_script
+from models.snapshot import Snapshot, SNAPSHOT_VERSION
+from models.variable_register import VariableRegister
+from values.number import Number
+
+ENGINES = list(jimmy_script.ENGINES)
+
+
+def test_sessions_do_not_share_identifiers():
+    busy = jimmy_script.Session()
+    busy.execute("\n".join(f"let unused_{i} = {i}" for i in range(1000)), "<test>")
+    session = jimmy_script.Session()
+    session.execute("let a = 1", "<test>")
+    assert len(session.variable_register.symbol_table) == 1
+    assert len(session.variable_register.values) == 1
+    assert session.execute("unused_1", "<test>")[1] is not None
+
+
+def test_lookup_searches_parents():
+    parent = VariableRegister()
+    parent.set("a", Number(1))
+    parent.set("b", Number(2))
+    child = VariableRegister(parent)
+    child.set("b", Number(3))
+    assert child.get("a").value == 1
+    assert child.get("b").value == 3
+    assert parent.get("b").value == 2
+    assert child.get("never_defined") is None
+    assert child.variables.keys() == {"b"}
+
+
+def test_store_none_removes_variable():
+    register = VariableRegister()
+    register.set("a", Number(1))
+    register.set("a", None)
+    assert register.get("a") is None
+    with pytest.raises(KeyError):
+        register.remove("a")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_share_session_variables(engine):
+    session = jimmy_script.Session()
+    session.execute("let x = 6", "<test>", engine)
+    value, error = session.execute("x * 7", "<test>", engine)
+    assert error is None
+    assert value.value == 42
+    assert session.variable_register.variables.keys() == {"x"}
+
+
+def test_snapshot_round_trip():
+    session = jimmy_script.Session()
+    session.execute("let x = 2\nlet y = 2^100", "<test>")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.snapshot")
+        assert session.save_snapshot(path, include_cache=False) == 2
+        restored = jimmy_script.Session()
+        assert restored.load_snapshot(path, warm_cache=False) == 2
+    value, error = restored.execute("x + y", "<test>")
+    assert error is None
+    assert value.value == 2 + 2 ** 100
+
+
+@pytest.mark.parametrize("fields", [
+    (SNAPSHOT_VERSION, ["x", "y"], [1], []),
+    (SNAPSHOT_VERSION, ["x"], ["1"], []),
+    (SNAPSHOT_VERSION, ["x"], [True], []),
+    (SNAPSHOT_VERSION, [1], [1], []),
+    (SNAPSHOT_VERSION, ["x"], [1], [("<test>", 1, True)]),
+    (SNAPSHOT_VERSION, ["x"], [1]),
+])
+def test_bad_snapshots_are_rejected(fields):
+    with pytest.raises(ValueError):
+        Snapshot.from_bytes(marshal.dumps(fields))
+
+
+def test_snapshot_save_leaves_no_temporary_file():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.snapshot")
+        Snapshot(["x", "z"], [1, 2j], [("<test>", "x", True)]).save(path)
+        Snapshot(["x"], [2.5]).save(path)
+        assert os.listdir(directory) == ["session.snapshot"]
+        snapshot = Snapshot.load(path)
+    assert (snapshot.names, snapshot.values) == (["x"], [2.5])
@@ -1,37 +1,44 @@
-from models.position import Interval
+from typing import Generator
 
+from models.position import File, Interval
 
-def arrows_under_string(text: str, interval: Interval, arrow_line_padding: int = 0) -> str:
-    pos_start = interval.start
-    pos_end = interval.end
 
-    # Following code taken from git repository:
-    # https://github.com/davidcallanan/py-myopl-code/blob/master/ep4/strings_with_arrows.py
-    # Modified slightly to fit the definition of my modules
-    result = ''
-
-    # Calculate indices
-    idx_start = max(text.rfind('\n', 0, pos_start.idx), 0)
-    idx_end = text.find('\n', idx_start + 1)
-    if idx_end < 0:
-        idx_end = len(text)
+def arrows_under_string(file: File, interval: Interval, arrow_line_padding: int = 0) -> str:
+    """
+    Return the lines of `file` covered by `interval`, each followed by a
+    line of arrows under the characters of the interval. Lines are read
+    from the line index of the file, so that the cost does not depend on
+    the size of the file. Every line but the first is indented by
+    `arrow_line_padding`, like the arrows.
+    """
+    # Rows and columns of offset positions are looked up on every access
+    start_row, start_col = interval.start.row, interval.start.col
+    end_row, end_col = interval.end.row, interval.end.col
+    padding = ' ' * arrow_line_padding
 
-    # Generate each line
-    line_count = pos_end.row - pos_start.row + 1
+    # Inspired by the git repository:
+    # https://github.com/davidcallanan/py-myopl-code/blob/master/ep4/strings_with_arrows.py
+    result = []
+    line_count = end_row - start_row + 1
     for i in range(line_count):
         # Calculate line columns
-        line = text[idx_start:idx_end]
-        col_start = pos_start.col if i == 0 else 0
-        col_end = pos_end.col if i == line_count - 1 else len(line) - 1
-
-        # Append to result
-        result += line + '\n'
-        result += ' ' * (col_start + arrow_line_padding) + '^' * (col_end - col_start)
-
-        # Re-calculate indices
-        idx_start = idx_end
-        idx_end = text.find('\n', idx_start + 1)
-        if idx_end < 0:
-            idx_end = len(text)
-
-    return result.replace('\t', '')
+        line = file.get_line(start_row + i)
+        col_start = start_col if i == 0 else 0
+        col_end = end_col if i == line_count - 1 else len(line) - 1
+
+        result.append(line if i == 0 else padding + line)
+        result.append(' ' * col_start + padding + '^' * (col_end - col_start))
+
+    return '\n'.join(result).replace('\t', '')
+
+
+def run_to_end(steps: Generator) -> any:
+    """
+    Run a generator pausing between slices of work, such as
+    `IterativeParser.expr_sliced`, without pausing, and return its value.
+    """
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
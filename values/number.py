@@ -1,3 +1,4 @@
+import math
 from typing import Optional
 
 from errors.interpret_error import InterpretError
@@ -5,10 +6,32 @@ from models.context import ExecutionContext
 from models.position import Interval
 
 
+def value_key(value: int or float) -> tuple:
+    """
+    Return a key telling apart values that compare equal but do not
+    behave the same, like 1 and 1.0, or 0.0 and -0.0.
+    """
+    if isinstance(value, float):
+        return float, value, math.copysign(1.0, value)
+    return type(value), value
+
+
+def power_bit_length(base: any, exponent: any) -> float:
+    """
+    Estimate the number of bits of `base ** exponent` without computing
+    it. Return 0 unless both are integers and the result may grow.
+    """
+    if not isinstance(base, int) or not isinstance(exponent, int) or exponent <= 0 or abs(base) <= 1:
+        return 0
+    return exponent * math.log2(abs(base))
+
+
 class Number:
     """
     A class to hold a numeric value.
     """
+    __slots__ = ("value", "interval", "context")
+
     # Value to hold
     value: int or float
     # Interval where this number occupies in Jimmy Script code file
@@ -20,6 +43,8 @@ class Number:
         self.value = value
         self.interval = interval
         self.context = context
+        if context is not None and context.stats is not None:
+            context.stats.number_allocations += 1
 
     def add(self, other):
         if not isinstance(other, Number):
@@ -34,6 +59,11 @@ class Number:
     def multiply(self, other):
         if not isinstance(other, Number):
             return
+        budget = self.get_budget()
+        if budget is not None:
+            error = budget.check_multiply(self.value, other.value, other.interval, self.context)
+            if error is not None:
+                return None, error
         return Number(self.value * other.value, context=self.context), None
 
     def divide(self, other):
@@ -46,8 +76,16 @@ class Number:
     def power(self, other):
         if not isinstance(other, Number):
             return
+        budget = self.get_budget()
+        if budget is not None:
+            error = budget.check_power(self.value, other.value, other.interval, self.context)
+            if error is not None:
+                return None, error
         return Number(self.value ** other.value, context=self.context), None
 
+    def get_budget(self):
+        return self.context.budget if self.context is not None else None
+
     def copy(self):
         return Number(self.value, self.interval, self.context)
 